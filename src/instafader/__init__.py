@@ -0,0 +1,3 @@
+"""Instafader core: turn an osu! skin into an insta-fading one."""
+
+__version__ = "1.0.0"
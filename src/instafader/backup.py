@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from datetime import datetime
+
+from . import trace
+
+BACKUP_PREFIX = "instafader-backup"
+STORE_FOLDER = ".instafader"
+INDEX_FILE = "index.json"
+
+
+def store_path(skin_folder: str, *parts: str) -> str:
+    """Path inside the skin's backup store.
+
+    Args:
+        skin_folder: Path to the skin folder
+        parts: Path components below the store folder
+
+    Returns:
+        str: Joined path
+    """
+    return os.path.join(skin_folder, STORE_FOLDER, *parts)
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def object_path(skin_folder: str, digest: str) -> str:
+    """Path of a stored object, sharded by the first two hex digits of its hash."""
+    return store_path(skin_folder, "objects", digest[:2], digest)
+
+
+@trace.traced("store_object")
+def store_object(skin_folder: str, path: str, digest: str | None = None) -> str:
+    """Add a file to the skin's content-addressed object store.
+
+    Files whose contents are already stored are not copied again.
+
+    Args:
+        skin_folder: Path to the skin folder
+        path: Path to the file to store
+        digest: Content hash of the file, hashed from path if not given
+
+    Returns:
+        str: Content hash of the file
+    """
+    digest = digest or hash_file(path)
+    destination = object_path(skin_folder, digest)
+    if os.path.exists(destination):
+        return digest
+
+    # Copy under a temporary name first so a partial copy is never mistaken
+    # for a stored object
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(destination))
+    os.close(fd)
+    try:
+        shutil.copy2(path, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return digest
+
+
+class Snapshot:
+    """Backup of a set of skin files, stored as a manifest of content hashes."""
+
+    def __init__(self, skin_folder: str):
+        self.skin_folder = skin_folder
+        self.name = datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f")
+        self.files: dict[str, str] = {}
+
+    def add(self, relative_path: str, digest: str | None = None) -> None:
+        """Back up one file of the skin.
+
+        Args:
+            relative_path: Path of the file relative to the skin folder
+            digest: Content hash of the file if already known, a file whose
+                contents are already stored is then not read at all
+        """
+        relative_path = relative_path.replace(os.sep, "/")
+        self.files[relative_path] = store_object(
+            self.skin_folder, os.path.join(self.skin_folder, relative_path), digest
+        )
+
+    def save(self, staging: str | None = None) -> str:
+        """Write the snapshot's manifest and add it to the store's index.
+
+        Args:
+            staging: Folder mirroring the skin folder to write both files to
+                instead, e.g. a transaction's staging folder, so the snapshot
+                only counts once the transaction is applied
+
+        Returns:
+            str: Path to the manifest, once in place
+        """
+        manifest_path = store_path(self.skin_folder, "snapshots", f"{self.name}.json")
+        index_path = store_path(self.skin_folder, INDEX_FILE)
+
+        def target(path: str) -> str:
+            if staging is None:
+                return path
+            return os.path.join(staging, os.path.relpath(path, self.skin_folder))
+
+        write_json(target(manifest_path), {"name": self.name, "files": self.files})
+
+        index = read_index(self.skin_folder)
+        if self.name not in index["snapshots"]:
+            index["snapshots"].append(self.name)
+        write_json(target(index_path), index)
+
+        return manifest_path
+
+
+def write_json(path: str, data: dict) -> None:
+    """Atomically write a JSON file through a temporary file and os.replace().
+
+    Args:
+        path: Path of the file
+        data: JSON-serializable data
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def read_index(skin_folder: str) -> dict:
+    """Read the store's index of snapshots, oldest first.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        dict: Index with a "snapshots" list of snapshot names
+    """
+    try:
+        with open(store_path(skin_folder, INDEX_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+
+    # Stores written before the index existed, snapshot names sort chronologically
+    snapshots_dir = store_path(skin_folder, "snapshots")
+    if not os.path.isdir(snapshots_dir):
+        return {"snapshots": []}
+
+    return {
+        "snapshots": sorted(
+            f.removesuffix(".json")
+            for f in os.listdir(snapshots_dir)
+            if f.endswith(".json")
+        )
+    }
+
+
+def get_latest_backup(skin_folder: str) -> dict | None:
+    """Load the manifest of the most recent snapshot of a skin from the index.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        dict | None: Manifest with "name" and "files", or None if no snapshots found
+    """
+    snapshots = read_index(skin_folder)["snapshots"]
+    if not snapshots:
+        return None
+
+    manifest_path = store_path(skin_folder, "snapshots", f"{snapshots[-1]}.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_latest_legacy_backup(skin_folder: str) -> str | None:
+    """Find the most recent backup folder made by older versions of Instafader.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        str | None: Path to most recent backup folder, or None if no backups found
+    """
+    backup_folders = [
+        d
+        for d in os.listdir(skin_folder)
+        if os.path.isdir(os.path.join(skin_folder, d)) and d.startswith(BACKUP_PREFIX)
+    ]
+
+    if not backup_folders:
+        return None
+
+    # Sort by creation time, newest first
+    backup_folders.sort(
+        key=lambda x: os.path.getctime(os.path.join(skin_folder, x)),
+        reverse=True,
+    )
+    return os.path.join(skin_folder, backup_folders[0])
+
+
+def is_unchanged(path: str, source: str, digest: str | None = None) -> bool:
+    """Check whether a skin file already matches its backed up version.
+
+    Sizes are compared first so that most changed files are detected without
+    hashing.
+
+    Args:
+        path: Path to the file in the skin
+        source: Path to the backed up copy
+        digest: Content hash of the backed up copy, hashed from source if not given
+
+    Returns:
+        bool: True if the file exists with identical contents
+    """
+    try:
+        if os.path.getsize(path) != os.path.getsize(source):
+            return False
+    except FileNotFoundError:
+        return False
+
+    return hash_file(path) == (digest or hash_file(source))
+
+
+@trace.traced("revert_to_backup")
+def revert_to_backup(
+    skin_folder: str, progress: Callable[[float], None] | None = None
+) -> str:
+    """Restore skin files from the most recent snapshot or backup folder.
+
+    Only files whose contents differ from the backup are copied. They are
+    all put in place at once when every one is ready.
+
+    Args:
+        skin_folder: Path to the skin folder
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+
+    Returns:
+        str: Name of the snapshot, or path to the backup folder, that was restored
+
+    Raises:
+        FileNotFoundError: If the skin has no backup to revert to
+    """
+    # Imported here as transactions are built on the store. An interrupted
+    # instafade is finished first, or the next run would apply it over the
+    # restored files.
+    from . import transaction
+
+    with transaction.SkinLock(skin_folder):
+        transaction.recover(skin_folder)
+
+        snapshot = get_latest_backup(skin_folder)
+        if snapshot:
+            name = snapshot["name"]
+            files = [
+                (relative_path, object_path(skin_folder, digest), digest)
+                for relative_path, digest in snapshot["files"].items()
+            ]
+        else:
+            name = get_latest_legacy_backup(skin_folder)
+            if not name:
+                raise FileNotFoundError("No backup found to revert to")
+
+            files = []
+            for root, _, file_names in os.walk(name):
+                for file_name in file_names:
+                    source = os.path.join(root, file_name)
+                    files.append((os.path.relpath(source, name), source, None))
+
+        # Staged like an instafade, so a cancelled or failed revert leaves the
+        # skin as it was
+        with transaction.Transaction(skin_folder) as staged:
+            for i, (relative_path, source, digest) in enumerate(files):
+                dst = os.path.join(skin_folder, relative_path)
+                with trace.span("restore", file=relative_path):
+                    if not is_unchanged(dst, source, digest):
+                        shutil.copy2(source, staged.path(relative_path))
+
+                if progress:
+                    progress((i + 1) / len(files))
+
+            staged.commit()
+
+        return name
@@ -0,0 +1,164 @@
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from . import cache, encode, ini, memory, pipeline, trace
+
+
+@dataclass
+class SkinResult:
+    """Outcome of instafading a single skin."""
+
+    skin_folder: str
+    ok: bool
+    seconds: float
+    error: str | None = None
+    files: list[encode.EncodeResult] = field(default_factory=list)
+    trace_events: list[dict] = field(default_factory=list)
+    peak_rss: int | None = None
+
+
+def find_skins(skins_dir: str) -> list[str]:
+    """Find every skin folder (a folder containing skin.ini) in a Skins directory.
+
+    Args:
+        skins_dir: Path to an osu! Skins directory, or to a single skin folder
+
+    Returns:
+        list[str]: Sorted paths of the skin folders found
+    """
+    if os.path.isfile(os.path.join(skins_dir, "skin.ini")):
+        return [skins_dir]
+
+    skins = []
+    with os.scandir(skins_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "skin.ini")):
+                skins.append(entry.path)
+
+    return sorted(skins)
+
+
+def process_skin(
+    skin_folder: str,
+    color: tuple[int, int, int] | None,
+    profile: str | None = None,
+    memory_budget: int | None = None,
+    render_cache: cache.RenderCache | None = None,
+    trim: bool = False,
+    palette: float | None = None,
+) -> SkinResult:
+    """Instafade one skin, capturing any error instead of raising it.
+
+    Args:
+        skin_folder: Path to the skin folder
+        color: RGB color tuple, or None to use the skin's first combo color
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        memory_budget: Bytes of decoded images to hold at once, see encode.Encoder
+        render_cache: Cache of renders shared with the other skins, if any
+        trim: Whether to crop the transparent padding around the numbers
+        palette: Largest error of palette images, see encode.save_png()
+
+    Returns:
+        SkinResult: Outcome of the run
+    """
+    start = time.perf_counter()
+    try:
+        with trace.span("process_skin", skin=os.path.basename(skin_folder)):
+            skin_ini = ini.load_skin_ini(skin_folder)
+            if color is None:
+                color = skin_ini.get_colors()[0]
+            with encode.Encoder(
+                profile, memory_budget=memory_budget, palette=palette
+            ) as encoder:
+                pipeline.instafade_skin(
+                    skin_folder,
+                    color,
+                    skin_ini.get_prefix(),
+                    encoder=encoder,
+                    render_cache=render_cache,
+                    trim=trim,
+                )
+    except Exception as e:
+        return SkinResult(
+            skin_folder,
+            False,
+            time.perf_counter() - start,
+            str(e),
+            trace_events=trace.collect(),
+            peak_rss=memory.peak_rss(),
+        )
+
+    # Spans recorded in this worker process are written by the parent
+    return SkinResult(
+        skin_folder,
+        True,
+        time.perf_counter() - start,
+        files=encoder.results,
+        trace_events=trace.collect(),
+        peak_rss=memory.peak_rss(),
+    )
+
+
+def run_batch(
+    skin_folders: list[str],
+    color: tuple[int, int, int] | None = None,
+    jobs: int | None = None,
+    on_result: Callable[[SkinResult], None] | None = None,
+    profile: str | None = None,
+    memory_budget: int | None = None,
+    render_cache: cache.RenderCache | None = None,
+    trim: bool = False,
+    palette: float | None = None,
+) -> list[SkinResult]:
+    """Instafade many skins in parallel across a process pool.
+
+    The memory budget applies to each worker process, so the pool holds at
+    most jobs times the budget in decoded images. The peak RSS reported with
+    each result is that of the worker, over every skin it processed so far.
+
+    Args:
+        skin_folders: Paths of the skin folders to instafade
+        color: RGB color tuple, or None to use each skin's first combo color
+        jobs: Number of worker processes, defaults to the CPU count
+        on_result: Optional callback invoked as each skin finishes
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        memory_budget: Bytes of decoded images each worker holds at once
+        render_cache: Cache of renders shared by every skin, e.g.
+            cache.default_cache(), so skins with the same elements render once
+        trim: Whether to crop the transparent padding around the numbers
+        palette: Largest error of palette images, see encode.save_png()
+
+    Returns:
+        list[SkinResult]: Outcomes in completion order
+    """
+    results = []
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                process_skin,
+                skin_folder,
+                color,
+                profile,
+                memory_budget,
+                render_cache,
+                trim,
+                palette,
+            )
+            for skin_folder in skin_folders
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            trace.add_events(result.trace_events)
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    # Workers only trim the cache now and then, bring it within its limit once
+    if render_cache:
+        render_cache.trim()
+
+    return results
@@ -0,0 +1,350 @@
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+import PIL
+from PIL import Image, ImageDraw
+
+from . import __version__, backup, encode, ini, memory, pipeline, preview, render, skin
+
+# Synthetic skins covering the element layouts the pipeline branches on
+SCENARIOS = {
+    "sd": {"hd_circle": False, "hd_overlay": False, "hd_numbers": False},
+    "hd": {},
+    "mixed": {"hd_overlay": False, "hd_numbers": False},
+    "oversized-numbers": {"number_size": 400},
+    "subfolder-prefix": {"prefix": "skin/numbers/default"},
+    "many-colors": {"colors": 8},
+}
+
+
+def make_circle(size: int, color: tuple[int, int, int], alpha: int) -> Image.Image:
+    """Draw a filled, outlined circle filling an image of the given size."""
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse(
+        (2, 2, size - 3, size - 3),
+        fill=(*color, alpha),
+        outline=(255, 255, 255, 255),
+        width=max(1, size // 20),
+    )
+    return image
+
+
+def make_skin(
+    skin_folder: str,
+    hd_circle: bool = True,
+    hd_overlay: bool = True,
+    hd_numbers: bool = True,
+    prefix: str = "default",
+    number_size: int | None = None,
+    colors: int = 4,
+    seed: int = 0,
+) -> None:
+    """Generate a synthetic skin with the elements and skin.ini Instafader reads.
+
+    Args:
+        skin_folder: Folder to create the skin in
+        hd_circle: Whether the hitcircle is HD
+        hd_overlay: Whether the hitcircleoverlay is HD
+        hd_numbers: Whether the numbers are HD
+        prefix: Hitcircle prefix, may include subfolders
+        number_size: Width of the numbers, defaults to a third of the circle
+        colors: Number of combo colors
+        seed: Seed for the random details, the same seed gives the same skin
+    """
+    rng = random.Random(seed)
+    os.makedirs(skin_folder, exist_ok=True)
+
+    def suffix(hd: bool) -> str:
+        return "@2x" if hd else ""
+
+    make_circle(256 if hd_circle else 128, (200, 200, 200), 255).save(
+        os.path.join(skin_folder, f"hitcircle{suffix(hd_circle)}.png")
+    )
+    make_circle(256 if hd_overlay else 128, (255, 255, 255), 80).save(
+        os.path.join(skin_folder, f"hitcircleoverlay{suffix(hd_overlay)}.png")
+    )
+
+    width = number_size or (86 if hd_numbers else 43)
+    for i in range(10):
+        number = Image.new("RGBA", (width, int(width * 1.3)), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(number)
+        draw.text((width // 4, width // 4), str(i), fill=(255, 255, 255, 255))
+        draw.rectangle(
+            (width // 3, width // 3, width // 3 + i + 2, width // 2),
+            fill=(rng.randint(0, 255),) * 3 + (255,),
+        )
+        path = os.path.join(skin_folder, f"{prefix}-{i}{suffix(hd_numbers)}.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        number.save(path)
+
+    make_circle(128, (200, 200, 200), 255).save(
+        os.path.join(skin_folder, "sliderstartcircle.png")
+    )
+
+    combos = "".join(
+        f"Combo{i + 1}: {rng.randint(0, 255)}, {rng.randint(0, 255)}, "
+        f"{rng.randint(0, 255)}\n"
+        for i in range(colors)
+    )
+    with open(os.path.join(skin_folder, "skin.ini"), "w", encoding="utf-8") as f:
+        f.write(
+            f"[General]\nName: synthetic-{seed}\n\n[Colours]\n{combos}\n"
+            f"[Fonts]\nHitCirclePrefix: {prefix}\nHitCircleOverlap: 3\n"
+        )
+
+
+def measure(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Callable[[], object] | None = None,
+) -> dict[str, float]:
+    """Time a function, running an untimed setup before every call.
+
+    Args:
+        func: Function to time
+        repeat: Number of timed calls
+        setup: Optional function run before each call, outside the timing
+
+    Returns:
+        dict: Minimum, median and mean seconds
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def run_scenario(
+    options: dict, repeat: int, work_dir: str
+) -> dict[str, dict[str, float]]:
+    """Benchmark every stage of the pipeline on one synthetic skin.
+
+    Args:
+        options: Keyword arguments for make_skin()
+        repeat: Number of timed runs of each stage
+        work_dir: Empty folder to generate skins and outputs in
+
+    Returns:
+        dict: Timings of each stage, by stage name
+    """
+    source = os.path.join(work_dir, "source")
+    make_skin(source, **options)
+    skin_folder = os.path.join(work_dir, "skin")
+    output_folder = os.path.join(work_dir, "output")
+
+    def fresh_skin() -> None:
+        shutil.rmtree(skin_folder, ignore_errors=True)
+        shutil.copytree(source, skin_folder)
+
+    def fresh_output() -> None:
+        shutil.rmtree(output_folder, ignore_errors=True)
+        os.makedirs(output_folder)
+
+    skin_ini = ini.load_skin_ini(source)
+    prefix = skin_ini.get_prefix()
+    colors = skin_ini.get_colors()
+    color = colors[0]
+    elements = pipeline.load_elements(source, prefix)
+    hitcircle_scale = render.calculate_resize_factor(
+        elements.hitcircle_hd, elements.hitcircleoverlay_hd
+    )
+    overlay_scale = render.calculate_resize_factor(
+        elements.hitcircleoverlay_hd, elements.hitcircle_hd
+    )
+    tinted = render.resize_element(
+        render.tint(elements.hitcircle, color), hitcircle_scale
+    )
+    overlay = render.resize_element(elements.hitcircleoverlay, overlay_scale)
+    circle = render.create_composite_image(tinted, overlay)
+    with open(os.path.join(source, "skin.ini"), "rb") as f:
+        ini_bytes = f.read()
+
+    def write_digits() -> None:
+        with encode.Encoder() as encoder:
+            pipeline.write_outputs(output_folder, elements, circle, encoder)
+            encoder.wait()
+
+    def rewrite_ini() -> None:
+        document = ini.SkinIni.parse(ini_bytes)
+        document.set_overlap("42")
+        document.set_color(color)
+        document.add_header()
+        document.save(os.path.join(output_folder, "skin.ini"))
+
+    def back_up() -> None:
+        snapshot = backup.Snapshot(skin_folder)
+        for path in os.listdir(skin_folder):
+            if os.path.isfile(os.path.join(skin_folder, path)):
+                snapshot.add(path)
+        snapshot.save()
+
+    def instafaded_skin() -> None:
+        fresh_skin()
+        pipeline.instafade_skin(skin_folder, color)
+
+    return {
+        "load_skin_element": measure(
+            lambda: skin.load_skin_element(source, "hitcircleoverlay"), repeat
+        ),
+        "tint": measure(lambda: render.tint(elements.hitcircle, color), repeat),
+        "resize_element": measure(
+            lambda: render.resize_element(elements.hitcircleoverlay, overlay_scale),
+            repeat,
+        ),
+        "create_composite_image": measure(
+            lambda: render.create_composite_image(tinted, overlay), repeat
+        ),
+        "digits": measure(write_digits, repeat, fresh_output),
+        "ini": measure(rewrite_ini, repeat, fresh_output),
+        "backup": measure(back_up, repeat, fresh_skin),
+        "revert": measure(
+            lambda: backup.revert_to_backup(skin_folder), repeat, instafaded_skin
+        ),
+        "instafade": measure(
+            lambda: pipeline.instafade_skin(skin_folder, color), repeat, fresh_skin
+        ),
+        "variants": measure(
+            lambda: pipeline.render_variants(source, colors, output_folder),
+            repeat,
+            fresh_output,
+        ),
+        "preview": measure(
+            lambda: preview.render_previews(source, prefix, colors), repeat
+        ),
+        "preview_low_fidelity": measure(
+            lambda: preview.render_previews(
+                source, prefix, colors, preview.PREVIEW_SIZE
+            ),
+            repeat,
+        ),
+    }
+
+
+def measure_startup(repeat: int) -> dict:
+    """Time fresh interpreters starting the command line and importing the core.
+
+    Args:
+        repeat: Number of timed starts of each command
+
+    Returns:
+        dict: Timings by command, with a bare interpreter as the baseline, and
+        whether importing the core loaded Tk
+    """
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run(*args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, *args],
+            cwd=src_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    core = "import instafader.batch, instafader.pipeline, instafader.preview"
+    tk_loaded = run(
+        "-c", f"{core}, sys; print('tkinter' in sys.modules)"
+    ).stdout.strip()
+
+    return {
+        "python": measure(lambda: run("-c", "pass"), repeat),
+        "cli_help": measure(lambda: run("-m", "instafader", "--help"), repeat),
+        "import_core": measure(lambda: run("-c", core), repeat),
+        "tk_loaded": tk_loaded == "True",
+    }
+
+
+def run_benchmarks(
+    scenarios: list[str] | None = None,
+    engines: list[str] | None = None,
+    repeat: int = 5,
+    progress: Callable[[str, str], None] | None = None,
+    startup: bool = True,
+) -> dict:
+    """Benchmark the pipeline on synthetic skins, once per render engine.
+
+    Args:
+        scenarios: Names of scenarios in SCENARIOS, defaults to all of them, an
+            empty list only times the startup
+        engines: Render engines to compare, defaults to the current one
+        repeat: Number of timed runs of each stage
+        progress: Optional callback receiving (engine, scenario) as each starts
+        startup: Whether to also time the startup of fresh interpreters
+
+    Returns:
+        dict: JSON-serializable results with the environment, the timings of
+        each stage, by engine and scenario, and the peak RSS of the whole run
+    """
+    results = {
+        "instafader": __version__,
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "png_profile": encode.PROFILE,
+        "repeat": repeat,
+        "engines": {},
+    }
+
+    if startup:
+        results["startup"] = measure_startup(repeat)
+
+    original_engine = render.ENGINE
+    try:
+        for engine in engines or [render.ENGINE]:
+            render.ENGINE = engine
+            results["engines"][engine] = {}
+            for name in list(SCENARIOS) if scenarios is None else scenarios:
+                if progress:
+                    progress(engine, name)
+                with tempfile.TemporaryDirectory(prefix="instafader-bench-") as d:
+                    results["engines"][engine][name] = run_scenario(
+                        SCENARIOS[name], repeat, d
+                    )
+    finally:
+        render.ENGINE = original_engine
+
+    results["peak_rss"] = memory.peak_rss()
+
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list[tuple[str, str, str, float]]:
+    """Compare median timings against an earlier run.
+
+    Args:
+        results: Results of run_benchmarks()
+        baseline: Earlier results of run_benchmarks()
+
+    Returns:
+        list: (engine, scenario, stage, ratio of new to old median) for every
+        stage present in both
+    """
+    ratios = []
+    for engine, scenarios in results["engines"].items():
+        for name, stages in scenarios.items():
+            old_stages = baseline["engines"].get(engine, {}).get(name, {})
+            for stage, timing in stages.items():
+                if stage in old_stages and old_stages[stage]["median"] > 0:
+                    ratio = timing["median"] / old_stages[stage]["median"]
+                    ratios.append((engine, name, stage, ratio))
+
+    return ratios
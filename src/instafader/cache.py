@@ -0,0 +1,141 @@
+import os
+import shutil
+import sys
+import tempfile
+
+from . import trace
+
+# Folder of the render cache, defaults to the user cache folder
+CACHE_DIR_ENV = "INSTAFADER_CACHE_DIR"
+# Size limit of the render cache in MiB, 0 disables it
+CACHE_SIZE_ENV = "INSTAFADER_CACHE_SIZE"
+CACHE_SIZE = 256
+# Trimming stats every entry, so it only runs once a cache object has added
+# this fraction of the size limit
+TRIM_EVERY = 16
+
+
+def default_cache_dir() -> str:
+    """Folder of the render cache, following each platform's convention."""
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "instafader", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/instafader")
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "instafader")
+
+
+class RenderCache:
+    """On-disk cache of rendered images shared by every skin.
+
+    Entries are keyed by a fingerprint of everything the image depends on,
+    such as the content hashes of the source elements, the color and the
+    pipeline version, so skins reusing the same elements reuse the renders.
+    Once the cache outgrows its size limit, the least recently used entries
+    are evicted. Entries are written atomically, so several processes can
+    share the cache. Evicting walks the whole cache, so put() only does it
+    after every 1/TRIM_EVERY of the limit it added; a long-lived object, or
+    a final trim(), keeps the cache close to its limit.
+
+    Args:
+        directory: Folder of the cache, defaults to default_cache_dir()
+        max_bytes: Size limit of the cache
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int | None = None):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else CACHE_SIZE * 1024 * 1024
+        )
+        # Bytes put since the last trim
+        self.added = 0
+
+    def entry_path(self, key: str) -> str:
+        """Path of an entry, sharded by the first two hex digits of its key."""
+        return os.path.join(self.directory, "renders", key[:2], f"{key}.png")
+
+    @trace.traced("cache_get")
+    def get(self, key: str, path: str) -> bool:
+        """Copy a cached image to a path.
+
+        Args:
+            key: Key of the entry
+            path: Path to copy the image to
+
+        Returns:
+            bool: Whether the entry was cached
+        """
+        entry = self.entry_path(key)
+        try:
+            shutil.copyfile(entry, path)
+            # The modification time orders the entries for eviction
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    @trace.traced("cache_put")
+    def put(self, key: str, path: str) -> None:
+        """Add a rendered image to the cache, trimming it now and then.
+
+        Args:
+            key: Key of the entry
+            path: Path of the image
+        """
+        entry = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, entry)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self.added += os.path.getsize(path)
+        if self.added >= self.max_bytes // TRIM_EVERY:
+            self.trim()
+
+    @trace.traced("cache_trim")
+    def trim(self) -> None:
+        """Evict the least recently used entries until the cache fits its limit."""
+        self.added = 0
+        entries = []
+        for root, _, file_names in os.walk(os.path.join(self.directory, "renders")):
+            for file_name in file_names:
+                # Skip entries still being written by another process
+                if not file_name.endswith(".png"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except (FileNotFoundError, PermissionError):
+                # Already evicted by another process, or open on Windows
+                continue
+            total -= size
+
+
+def default_cache() -> RenderCache | None:
+    """Render cache configured through the environment, None when disabled."""
+    size = int(os.environ.get(CACHE_SIZE_ENV, CACHE_SIZE))
+    if size <= 0:
+        return None
+
+    return RenderCache(max_bytes=size * 1024 * 1024)
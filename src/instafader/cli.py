@@ -0,0 +1,672 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Subcommands import the pipeline when they run, so --help and argument errors
+# don't pay for Pillow and the process pool
+from . import cache, encode, ini, memory, trace
+
+
+def parse_color(value: str) -> tuple[int, int, int]:
+    """Parse an "r, g, b" string into an RGB color tuple.
+
+    Args:
+        value: Comma separated color components
+
+    Returns:
+        tuple[int, int, int]: RGB color tuple
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid color
+    """
+    try:
+        return ini.parse_color(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def add_output_arguments(parser: argparse.ArgumentParser, verbose: bool = True) -> None:
+    """Add the PNG encoding and report options shared by subcommands."""
+    parser.add_argument(
+        "--png",
+        choices=list(encode.PROFILES),
+        default=encode.PROFILE,
+        help=f"PNG encoder profile (default: {encode.PROFILE})",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="MiB of decoded images to hold at once, per process, rendering "
+        "and encoding fewer images in parallel to stay within it "
+        f"(default: ${memory.MEMORY_BUDGET_ENV} or unbounded)",
+    )
+    parser.add_argument(
+        "--palette",
+        type=float,
+        nargs="?",
+        const=encode.PALETTE_MAX_ERROR,
+        metavar="MAX_ERROR",
+        help="save each image as an 8-bit palette PNG when that is smaller and "
+        "differs from full color by at most MAX_ERROR (RMS, in 8-bit levels, "
+        f"default {encode.PALETTE_MAX_ERROR})",
+    )
+    parser.add_argument(
+        "--trim",
+        action="store_true",
+        help="crop the transparent padding around the numbers, keeping them "
+        "centered, for smaller textures",
+    )
+    if verbose:
+        parser.add_argument(
+            "--verbose",
+            "-v",
+            action="store_true",
+            help="list the encode time and size of every file written",
+        )
+
+
+def add_cache_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the option turning off the render cache shared by every skin."""
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="render every number instead of copying renders of identical "
+        "elements from the cache shared by every skin "
+        f"(size: ${cache.CACHE_SIZE_ENV} MiB, default {cache.CACHE_SIZE}, "
+        f"folder: ${cache.CACHE_DIR_ENV})",
+    )
+
+
+def render_cache(args: argparse.Namespace) -> cache.RenderCache | None:
+    """Render cache to use given the command line, if any."""
+    return None if args.no_cache else cache.default_cache()
+
+
+def format_size(size: int) -> str:
+    """Format a byte count in KiB."""
+    return f"{size / 1024:.1f} KiB"
+
+
+def format_rss(peak: int | None) -> str:
+    """Format a peak RSS in MiB, or "n/a" where the platform doesn't report it."""
+    return "n/a" if peak is None else f"{peak / memory.MIB:.1f} MiB"
+
+
+def memory_budget(args: argparse.Namespace) -> int | None:
+    """Memory budget in bytes given on the command line, if any."""
+    return args.memory_budget * memory.MIB if args.memory_budget else None
+
+
+def print_files(files: list[encode.EncodeResult], root: str) -> None:
+    """Print the encode time and size of each written file."""
+    for result in sorted(files, key=lambda result: result.path):
+        palette = (
+            f"  palette, {format_size(result.saved)} saved" if result.palette else ""
+        )
+        print(
+            f"    {os.path.relpath(result.path, root)}  "
+            f"{'cached' if result.cached else f'{result.seconds * 1000:.1f} ms'}  "
+            f"{format_size(result.size)}{palette}"
+        )
+
+
+def print_palette_savings(files: list[encode.EncodeResult]) -> None:
+    """Print how many files were saved as palette images and the bytes saved."""
+    palette = [file for file in files if file.palette]
+    print(
+        f"{len(palette)} of {len(files)} files as palette images, "
+        f"{format_size(sum(file.saved for file in palette))} saved"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog="instafader", description="Turn osu! skins into insta-fading ones."
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write a Chrome trace of every stage to FILE and print a summary",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="instafade every skin in a Skins directory"
+    )
+    batch_parser.add_argument(
+        "skins_dir", help="osu! Skins directory, or a single skin folder"
+    )
+    batch_parser.add_argument(
+        "--color",
+        type=parse_color,
+        help='combo color as "r,g,b" (default: each skin\'s first combo color)',
+    )
+    batch_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of worker processes (default: CPU count)",
+    )
+    batch_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="list the changes each skin would get and their estimated cost, "
+        "without changing anything",
+    )
+    add_output_arguments(batch_parser)
+    add_cache_argument(batch_parser)
+    batch_parser.set_defaults(func=run_batch_command)
+
+    variants_parser = subparsers.add_parser(
+        "variants",
+        help="render one output set per combo color, without touching the skin",
+    )
+    variants_parser.add_argument("skin_folder", help="skin folder")
+    variants_parser.add_argument(
+        "--color",
+        type=parse_color,
+        action="append",
+        help='color as "r,g,b", may be repeated (default: all the skin\'s combo colors)',
+    )
+    variants_parser.add_argument(
+        "--output",
+        help="folder receiving one subfolder per color "
+        "(default: <skin_folder>/instafader-variants)",
+    )
+    add_output_arguments(variants_parser)
+    variants_parser.set_defaults(func=run_variants_command)
+
+    osk_parser = subparsers.add_parser(
+        "osk",
+        help="instafade a .osk archive into a new one, without extracting it",
+    )
+    osk_parser.add_argument("osk", help=".osk file")
+    osk_parser.add_argument(
+        "--color",
+        type=parse_color,
+        help='combo color as "r,g,b" (default: the skin\'s first combo color)',
+    )
+    osk_parser.add_argument(
+        "--output", help='path of the new archive (default: "<name> (instafade).osk")'
+    )
+    add_output_arguments(osk_parser)
+    osk_parser.set_defaults(func=run_osk_command)
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="instafade a skin and again on every change to its elements",
+    )
+    watch_parser.add_argument("skin_folder", help="skin folder")
+    watch_parser.add_argument(
+        "--color",
+        type=parse_color,
+        help='combo color as "r,g,b" (default: the skin\'s first combo color)',
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="seconds between checks for changes (default: 0.5)",
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=1.0,
+        help="seconds without changes to wait before regenerating (default: 1.0)",
+    )
+    add_output_arguments(watch_parser)
+    add_cache_argument(watch_parser)
+    watch_parser.set_defaults(func=run_watch_command)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="serve instafades of uploaded .osk archives over HTTP",
+    )
+    serve_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address to listen on (default: 127.0.0.1, this machine only)",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="port to listen on (default: 8000)",
+    )
+    serve_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of worker processes (default: CPU count)",
+    )
+    serve_parser.add_argument(
+        "--queue",
+        type=int,
+        default=8,
+        help="requests waiting for a worker before new ones are turned away "
+        "(default: 8)",
+    )
+    serve_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=120,
+        help="seconds a request may take (default: 120)",
+    )
+    serve_parser.add_argument(
+        "--max-upload",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="largest archive accepted in MiB (default: 256)",
+    )
+    serve_parser.add_argument(
+        "--quiet", "-q", action="store_true", help="don't log every request"
+    )
+    add_output_arguments(serve_parser, verbose=False)
+    serve_parser.set_defaults(func=run_serve_command)
+
+    scan_parser = subparsers.add_parser(
+        "scan",
+        help="list the skins in a Skins directory from their headers, "
+        "without decoding any image",
+    )
+    scan_parser.add_argument(
+        "skins_dir", help="osu! Skins directory, or a single skin folder"
+    )
+    scan_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of threads (default: 4 per CPU, at most 32)",
+    )
+    scan_parser.add_argument("--output", help="write the index to a JSON file")
+    scan_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="list the size of every element"
+    )
+    scan_parser.set_defaults(func=run_scan_command)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="benchmark the pipeline on synthetic skins"
+    )
+    bench_parser.add_argument(
+        "--scenario",
+        action="append",
+        metavar="NAME",
+        help="scenario to run: sd, hd, mixed, oversized-numbers, subfolder-prefix "
+        "or many-colors, may be repeated (default: all)",
+    )
+    bench_parser.add_argument(
+        "--engine",
+        choices=["fast", "reference"],
+        action="append",
+        help="render engine to time, may be repeated (default: the current one)",
+    )
+    bench_parser.add_argument(
+        "--repeat", type=int, default=5, help="timed runs of each stage (default: 5)"
+    )
+    bench_parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="only time interpreter startup and imports",
+    )
+    bench_parser.add_argument("--output", help="write the results to a JSON file")
+    bench_parser.add_argument(
+        "--baseline", help="JSON results of an earlier run to compare against"
+    )
+    bench_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown against the baseline that counts as a regression "
+        "(default: 1.2)",
+    )
+    bench_parser.set_defaults(func=run_bench_command)
+
+    return parser
+
+
+def run_batch_command(args: argparse.Namespace) -> int:
+    """Run the batch subcommand."""
+    from . import batch
+
+    skin_folders = batch.find_skins(args.skins_dir)
+    if not skin_folders:
+        print(f"No skins found in {args.skins_dir}", file=sys.stderr)
+        return 1
+
+    if args.dry_run:
+        return print_plans(skin_folders, args)
+
+    def on_result(result: batch.SkinResult) -> None:
+        name = os.path.basename(result.skin_folder)
+        if result.ok:
+            size = sum(file.size for file in result.files)
+            print(
+                f"[ ok ] {name} ({result.seconds:.2f}s, "
+                f"{len(result.files)} files, {format_size(size)}, "
+                f"peak RSS {format_rss(result.peak_rss)})"
+            )
+            if args.verbose:
+                print_files(result.files, result.skin_folder)
+        else:
+            print(f"[fail] {name}: {result.error}")
+
+    start = time.perf_counter()
+    results = batch.run_batch(
+        skin_folders,
+        args.color,
+        args.jobs,
+        on_result,
+        args.png,
+        memory_budget(args),
+        render_cache(args),
+        args.trim,
+        args.palette,
+    )
+    elapsed = time.perf_counter() - start
+
+    failed = sum(not result.ok for result in results)
+    files = [file for result in results for file in result.files]
+    print(
+        f"{len(results)} skins ({len(results) - failed} ok, {failed} failed) "
+        f"in {elapsed:.2f}s, {len(results) / elapsed:.2f} skins/s"
+    )
+    print(
+        f"{len(files)} files ({sum(file.cached for file in files)} from cache), "
+        f"{format_size(sum(file.size for file in files))}, "
+        f"{sum(file.seconds for file in files):.2f}s encoding ({args.png})"
+    )
+    if args.palette is not None:
+        print_palette_savings(files)
+    peaks = [result.peak_rss for result in results if result.peak_rss is not None]
+    print(f"peak RSS {format_rss(max(peaks, default=None))} (largest worker)")
+
+    return 1 if failed else 0
+
+
+def print_plans(skin_folders: list[str], args: argparse.Namespace) -> int:
+    """Print what instafading each skin would change, for batch --dry-run."""
+    from . import ini, pipeline
+
+    failed = 0
+    pixels = size = 0
+    for skin_folder in skin_folders:
+        name = os.path.basename(skin_folder)
+        try:
+            color = args.color or ini.load_skin_ini(skin_folder).get_colors()[0]
+            shared_cache = render_cache(args)
+            plan = pipeline.plan_instafade(
+                skin_folder,
+                color,
+                profile=args.png,
+                render_cache=shared_cache,
+                trim=args.trim,
+                palette=args.palette,
+            )
+            operations = plan.operations(shared_cache)
+        except Exception as e:
+            failed += 1
+            print(f"[fail] {name}: {e}")
+            continue
+
+        if not operations:
+            print(f"[skip] {name}: up to date")
+            continue
+
+        skin_pixels = sum(operation.pixels for operation in operations)
+        skin_size = sum(operation.size for operation in operations)
+        pixels += skin_pixels
+        size += skin_size
+        print(
+            f"[plan] {name}: {len(operations)} changes, "
+            f"{skin_pixels / 1e6:.2f} MP to render, {format_size(skin_size)} to copy "
+            "or remove"
+        )
+        for operation in operations:
+            cost = (
+                f"{operation.pixels / 1e6:.2f} MP"
+                if operation.pixels
+                else format_size(operation.size) if operation.size else ""
+            )
+            print(
+                f"    {operation.action:<8}{operation.relative_path}  {cost}".rstrip()
+            )
+
+    print(
+        f"{len(skin_folders)} skins, {pixels / 1e6:.2f} MP to render, "
+        f"{format_size(size)} to copy or remove"
+    )
+
+    return 1 if failed else 0
+
+
+def run_variants_command(args: argparse.Namespace) -> int:
+    """Run the variants subcommand."""
+    from . import ini, pipeline
+
+    colors = args.color or ini.load_skin_ini(args.skin_folder).get_colors()
+    output_dir = args.output or os.path.join(args.skin_folder, pipeline.VARIANTS_FOLDER)
+
+    start = time.perf_counter()
+    with encode.Encoder(
+        args.png, memory_budget=memory_budget(args), palette=args.palette
+    ) as encoder:
+        output_folders = pipeline.render_variants(
+            args.skin_folder, colors, output_dir, encoder=encoder, trim=args.trim
+        )
+    elapsed = time.perf_counter() - start
+
+    for output_folder in output_folders:
+        print(output_folder)
+    if args.verbose:
+        print_files(encoder.results, output_dir)
+    print(f"{len(output_folders)} color variants in {elapsed:.2f}s")
+    print(
+        f"{len(encoder.results)} files, "
+        f"{format_size(sum(file.size for file in encoder.results))}, "
+        f"{sum(file.seconds for file in encoder.results):.2f}s encoding ({args.png})"
+    )
+    if args.palette is not None:
+        print_palette_savings(encoder.results)
+    print(f"peak RSS {format_rss(memory.peak_rss())}")
+
+    return 0
+
+
+def run_osk_command(args: argparse.Namespace) -> int:
+    """Run the osk subcommand."""
+    from . import osk
+
+    start = time.perf_counter()
+    with encode.Encoder(
+        args.png, memory_budget=memory_budget(args), palette=args.palette
+    ) as encoder:
+        output_path = osk.instafade_osk(
+            args.osk, args.color, args.output, encoder=encoder, trim=args.trim
+        )
+    elapsed = time.perf_counter() - start
+
+    if args.verbose:
+        print_files(
+            encoder.results,
+            os.path.commonpath(
+                [os.path.dirname(result.path) for result in encoder.results]
+            ),
+        )
+    print(f"{output_path} in {elapsed:.2f}s, peak RSS {format_rss(memory.peak_rss())}")
+    if args.palette is not None:
+        print_palette_savings(encoder.results)
+
+    return 0
+
+
+def run_watch_command(args: argparse.Namespace) -> int:
+    """Run the watch subcommand."""
+    from . import ini, watch
+
+    color = args.color or ini.load_skin_ini(args.skin_folder).get_colors()[0]
+
+    def on_run(result: watch.WatchRun) -> None:
+        changed = ", ".join(result.changed) or "initial run"
+        if result.error:
+            print(f"[fail] {changed}: {result.error}")
+            return
+
+        print(
+            f"[ ok ] {changed} ({result.seconds:.2f}s, {len(result.written)} files, "
+            f"peak RSS {format_rss(memory.peak_rss())})"
+        )
+        if args.verbose:
+            for path in sorted(result.written):
+                print(f"    {path}")
+
+    print(f"Watching {args.skin_folder}, press Ctrl+C to stop", file=sys.stderr)
+    try:
+        watch.watch(
+            args.skin_folder,
+            color,
+            on_run,
+            interval=args.interval,
+            debounce=args.debounce,
+            profile=args.png,
+            memory_budget=memory_budget(args),
+            render_cache=render_cache(args),
+            trim=args.trim,
+            palette=args.palette,
+        )
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+def run_serve_command(args: argparse.Namespace) -> int:
+    """Run the serve subcommand."""
+    from . import server
+
+    with server.InstafadeService(
+        args.jobs,
+        args.queue,
+        args.timeout,
+        args.png,
+        memory_budget(args),
+        args.trim,
+        args.palette,
+    ) as service, server.InstafadeServer(
+        (args.host, args.port), service, args.max_upload * memory.MIB, args.quiet
+    ) as httpd:
+        host, port = httpd.server_address[:2]
+        print(
+            f"Serving on http://{host}:{port} ({service.jobs} workers), "
+            "press Ctrl+C to stop",
+            file=sys.stderr,
+        )
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    return 0
+
+
+def run_scan_command(args: argparse.Namespace) -> int:
+    """Run the scan subcommand."""
+    from . import scan
+
+    def on_skin(info: scan.SkinInfo) -> None:
+        name = os.path.basename(info.skin_folder)
+        if info.error:
+            print(f"[fail] {name}: {info.error}")
+            return
+
+        circle = info.elements["hitcircleoverlay"]
+        number = info.elements[f"{info.prefix}-1"]
+        print(
+            f"[ ok ] {name}: prefix {info.prefix}, "
+            f"{'HD' if circle.hd else 'SD'} circle, "
+            f"{'HD' if number.hd else 'SD'} numbers, overlap {info.overlap}, "
+            f"{len(info.colors)} colors{', instafaded' if info.instafaded else ''}"
+        )
+        if args.verbose:
+            for element in info.elements.values():
+                print(f"    {element.path}  {element.width}x{element.height}")
+
+    start = time.perf_counter()
+    skins = scan.scan_library(args.skins_dir, args.jobs, on_skin)
+    elapsed = time.perf_counter() - start
+    if not skins:
+        print(f"No skins found in {args.skins_dir}", file=sys.stderr)
+        return 1
+
+    failed = sum(info.error is not None for info in skins)
+    print(f"{len(skins)} skins ({failed} failed) in {elapsed:.2f}s")
+    if args.output:
+        scan.write_index(args.output, args.skins_dir, skins)
+
+    return 1 if failed else 0
+
+
+def run_bench_command(args: argparse.Namespace) -> int:
+    """Run the bench subcommand."""
+    from . import backup, bench
+
+    unknown = set(args.scenario or []) - set(bench.SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    results = bench.run_benchmarks(
+        [] if args.startup else args.scenario,
+        args.engine,
+        args.repeat,
+        lambda engine, name: print(f"running {name} ({engine})", file=sys.stderr),
+    )
+
+    startup = results["startup"]
+    print("startup")
+    for command in ["python", "cli_help", "import_core"]:
+        print(f"    {command:<24}{startup[command]['median'] * 1000:>10.2f} ms")
+    print(f"    {'tk_loaded':<24}{startup['tk_loaded']!s:>10}")
+
+    for engine, scenarios in results["engines"].items():
+        for name, stages in scenarios.items():
+            print(f"{engine} / {name}")
+            for stage, timing in stages.items():
+                print(f"    {stage:<24}{timing['median'] * 1000:>10.2f} ms")
+    print(f"peak RSS {format_rss(results['peak_rss'])}")
+
+    if args.output:
+        backup.write_json(os.path.abspath(args.output), results)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = 0
+    for engine, name, stage, ratio in bench.compare(results, baseline):
+        slower = ratio > args.threshold
+        regressions += slower
+        print(
+            f"{'[slow]' if slower else '[ ok ]'} {engine} / {name} / {stage}: "
+            f"{ratio:.2f}x"
+        )
+
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        trace.enable(args.trace)
+
+    return args.func(args)
@@ -0,0 +1,232 @@
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from . import memory, trace
+
+# Pillow and the thread pool are only needed once an image is saved, keeping
+# the CLI, which reads PROFILES, quick to start
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from PIL import Image
+
+# Keyword arguments passed to Image.save() for each profile. Balanced matches
+# Pillow's defaults, so its output is identical to a bare save().
+PROFILES = {
+    "fast": {"compress_level": 1},
+    "balanced": {"compress_level": 6},
+    "smallest": {"compress_level": 9, "optimize": True},
+}
+PROFILE = os.environ.get("INSTAFADER_PNG_PROFILE", "balanced")
+ENCODE_WORKERS = os.cpu_count() or 1
+# Largest RMS difference from the full color image, in 8-bit levels, for a
+# palette image to be used instead
+PALETTE_MAX_ERROR = 2.0
+
+
+@dataclass
+class EncodeResult:
+    """Time taken and size written for one saved image."""
+
+    path: str
+    seconds: float
+    size: int
+    # Copied from the render cache instead of encoded
+    cached: bool = False
+    # Saved as an 8-bit palette image, and the bytes that saved over RGBA
+    palette: bool = False
+    saved: int = 0
+
+
+def palettize(image: "Image.Image", max_error: float) -> "Image.Image | None":
+    """Quantize an image to 256 colors with alpha, if it stays close enough.
+
+    Colors are compared premultiplied by alpha, so the color of invisible
+    pixels doesn't count.
+
+    Args:
+        image: RGBA image
+        max_error: Largest RMS difference of any channel, in 8-bit levels
+
+    Returns:
+        Image.Image | None: Palette image, or None when it differs too much
+    """
+    from PIL import Image, ImageChops, ImageStat
+
+    def premultiplied(rgba: Image.Image) -> Image.Image:
+        return Image.frombytes("RGBA", rgba.size, rgba.convert("RGBa").tobytes())
+
+    with trace.span("palettize"):
+        # Only the octree quantizer keeps alpha without libimagequant. A palette
+        # no larger than needed keeps images with few colors, e.g. blanks, small
+        colors = len(image.getcolors(256) or range(256))
+        quantized = image.quantize(
+            colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE
+        )
+        difference = ImageChops.difference(
+            premultiplied(image), premultiplied(quantized.convert("RGBA"))
+        )
+        error = max(ImageStat.Stat(difference).rms)
+
+    return quantized if error <= max_error else None
+
+
+def save_png(
+    image: "Image.Image",
+    path: str,
+    profile: str | None = None,
+    palette: float | None = None,
+) -> EncodeResult:
+    """Encode and write an image as PNG.
+
+    Args:
+        image: Image to save
+        path: Path to save to
+        profile: Name of a profile in PROFILES, defaults to PROFILE
+        palette: Largest error allowed for saving an RGBA image as an 8-bit
+            palette image instead, see palettize(). The palette image is only
+            kept when smaller. None always saves full color
+
+    Returns:
+        EncodeResult: Encode time and size of the written file
+    """
+    options = PROFILES[profile or PROFILE]
+    start = time.perf_counter()
+    with trace.span("encode", file=os.path.basename(path)):
+        quantized = None
+        if palette is not None and image.mode == "RGBA":
+            quantized = palettize(image, palette)
+        if quantized is None:
+            image.save(path, "PNG", **options)
+            return EncodeResult(
+                path, time.perf_counter() - start, os.path.getsize(path)
+            )
+
+        # Both are encoded to report the saving and keep the smaller
+        encoded = []
+        for candidate in [image, quantized]:
+            buffer = io.BytesIO()
+            candidate.save(buffer, "PNG", **options)
+            encoded.append(buffer.getvalue())
+        full_color, indexed = encoded
+        data = min(full_color, indexed, key=len)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    return EncodeResult(
+        path,
+        time.perf_counter() - start,
+        len(data),
+        palette=data is indexed,
+        saved=len(full_color) - len(data),
+    )
+
+
+class Encoder:
+    """Saves images on a thread pool so encoding overlaps with rendering.
+
+    Pillow releases the GIL while compressing, so encodes run in parallel with
+    each other and with the rendering thread.
+
+    With a memory budget, half of it bounds the decoded images waiting to be
+    written and save() blocks until there is room. The other half is left to
+    the images being rendered, see pipeline.write_outputs().
+
+    Args:
+        profile: Name of a profile in PROFILES, defaults to PROFILE
+        max_workers: Number of encoding threads, defaults to ENCODE_WORKERS
+        memory_budget: Bytes of decoded images to hold at once, defaults to
+            memory.default_budget(), unbounded when None
+        palette: Largest error allowed for saving images as 8-bit palette
+            images, see save_png(). None always saves full color
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+
+    def __init__(
+        self,
+        profile: str | None = None,
+        max_workers: int | None = None,
+        memory_budget: int | None = None,
+        palette: float | None = None,
+    ):
+        self.profile = profile or PROFILE
+        self.palette = palette
+        if self.profile not in PROFILES:
+            raise ValueError(f"Unknown PNG profile: {self.profile}")
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.results: list[EncodeResult] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or ENCODE_WORKERS)
+        self._pending: list["Future"] = []
+        self.memory_budget = memory_budget or memory.default_budget()
+        self._queued_bytes = 0
+        self._queue_space = threading.Condition()
+
+    def save(self, image: "Image.Image", path: str) -> None:
+        """Queue an image to be saved. The image must not be modified afterwards.
+
+        Safe to call from several threads. Blocks while the queue is full when
+        there is a memory budget.
+
+        Args:
+            image: Image to save
+            path: Path to save to
+        """
+        if not self.memory_budget:
+            self._pending.append(
+                self._executor.submit(save_png, image, path, self.profile, self.palette)
+            )
+            return
+
+        size = memory.image_bytes(image)
+        with self._queue_space:
+            # An image larger than the budget still goes through, on its own
+            while (
+                self._queued_bytes
+                and self._queued_bytes + size > self.memory_budget // 2
+            ):
+                self._queue_space.wait()
+            self._queued_bytes += size
+
+        future = self._executor.submit(
+            save_png, image, path, self.profile, self.palette
+        )
+        future.add_done_callback(lambda _: self._release(size))
+        self._pending.append(future)
+
+    def _release(self, size: int) -> None:
+        with self._queue_space:
+            self._queued_bytes -= size
+            self._queue_space.notify_all()
+
+    def wait(self) -> list[EncodeResult]:
+        """Wait until every queued image is written.
+
+        Returns:
+            list[EncodeResult]: Results of the images written since the last wait
+
+        Raises:
+            Exception: The first error raised while saving
+        """
+        pending, self._pending = self._pending, []
+        with trace.span("encode_wait"):
+            results = [future.result() for future in pending]
+        self.results.extend(results)
+        return results
+
+    def close(self) -> None:
+        """Drop queued images that haven't started and stop the threads."""
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "Encoder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
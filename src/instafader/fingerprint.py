@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from . import backup, trace
+
+FINGERPRINT_FILE = "fingerprint.json"
+
+
+def fingerprint(*parts) -> str:
+    """Hash JSON-serializable values into a hex digest."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def file_digest(path: str) -> str | None:
+    """Return the SHA-256 hex digest of a file, or None if it doesn't exist."""
+    try:
+        return backup.hash_file(path)
+    except FileNotFoundError:
+        return None
+
+
+def fingerprint_path(skin_folder: str) -> str:
+    """Path of the sidecar left by the last instafade of a skin."""
+    return backup.store_path(skin_folder, FINGERPRINT_FILE)
+
+
+def read_fingerprint(skin_folder: str) -> dict | None:
+    """Read the sidecar left by the last instafade of a skin.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        dict | None: Sidecar contents, or None if the skin has none
+    """
+    try:
+        with open(fingerprint_path(skin_folder), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@trace.traced("resolve_inputs")
+def resolve_inputs(
+    skin_folder: str, relative_paths: list[str], previous: dict | None
+) -> tuple[dict[str, str | None], dict[str, str | None]]:
+    """Find the original contents of the files an instafade reads.
+
+    A file that still matches what the previous run left behind is one of its
+    outputs, so its input is the original recorded by that run, recoverable
+    from the backup store. Any other file is a fresh input.
+
+    Args:
+        skin_folder: Path to the skin folder
+        relative_paths: Paths of the files relative to the skin folder
+        previous: Sidecar of the previous run, or None
+
+    Returns:
+        tuple: (content hash of each input, content hash of each file as it is
+        now), None for files that don't exist
+    """
+    current = {
+        relative_path: file_digest(os.path.join(skin_folder, relative_path))
+        for relative_path in relative_paths
+    }
+    inputs = dict(current)
+    if not previous:
+        return inputs, current
+
+    for relative_path in relative_paths:
+        if relative_path not in previous["inputs"]:
+            continue
+        if current[relative_path] != previous["outputs"].get(relative_path):
+            continue
+
+        digest = previous["inputs"][relative_path]
+        if digest is None or os.path.exists(backup.object_path(skin_folder, digest)):
+            inputs[relative_path] = digest
+
+    return inputs, current
@@ -0,0 +1,279 @@
+import functools
+import os
+import re
+import shutil
+import uuid
+from typing import NamedTuple
+
+# Constants
+DEFAULT_COLORS = [(255, 192, 0), (0, 202, 0), (18, 124, 255), (242, 24, 57)]
+HEADER = "// instafade skin generated by https://github.com/SnowzNZ/instafader"
+
+
+class Line(NamedTuple):
+    """One line of skin.ini: its text, original line ending and section."""
+
+    text: str
+    ending: str
+    section: str | None
+
+
+def section_name(text: str) -> str | None:
+    """Return the section name if a line is a section header like "[Colours]"."""
+    stripped = text.strip()
+    if stripped.startswith("[") and stripped.endswith("]"):
+        return stripped[1:-1].strip()
+
+    return None
+
+
+def parse_color(value: str) -> tuple[int, int, int]:
+    """Parse an "r,g,b" string into an RGB color tuple.
+
+    Args:
+        value: Comma separated color components
+
+    Returns:
+        tuple[int, int, int]: RGB color tuple
+
+    Raises:
+        ValueError: If the value is not a valid color
+    """
+    try:
+        color = tuple(int(component) for component in value.split(","))
+    except ValueError:
+        raise ValueError(f"invalid color: {value!r}") from None
+
+    if len(color) != 3 or not all(0 <= component <= 255 for component in color):
+        raise ValueError(f"invalid color: {value!r}")
+
+    return color
+
+
+def is_commented(text: str, key: str) -> bool:
+    """Whether a "//" comment starts before the key on a line."""
+    return "//" in text and text.find("//") < text.find(key)
+
+
+class SkinIni:
+    """Parsed skin.ini that keeps every line, comment, encoding and line ending.
+
+    Edits are applied in memory and written back with a single atomic save().
+    """
+
+    def __init__(self, lines: list[Line], encoding: str, newline: str):
+        self.lines = lines
+        self.encoding = encoding
+        self.newline = newline
+
+    @classmethod
+    def parse(cls, data: bytes) -> "SkinIni":
+        """Parse the raw contents of a skin.ini file.
+
+        Args:
+            data: Contents of the file
+
+        Returns:
+            SkinIni: Parsed document
+        """
+        # Skins in the wild are mostly UTF-8, some older ones are not. Latin-1
+        # maps every byte, so those still round-trip unchanged.
+        encoding = "utf-8-sig" if data.startswith(b"\xef\xbb\xbf") else "utf-8"
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+            text = data.decode(encoding)
+
+        lines = []
+        section = None
+        raw_lines = text.split("\n")
+        for i, raw_line in enumerate(raw_lines):
+            if i == len(raw_lines) - 1:
+                if raw_line:
+                    lines.append(Line(raw_line, "", section))
+                break
+
+            if raw_line.endswith("\r"):
+                line = Line(raw_line[:-1], "\r\n", section)
+            else:
+                line = Line(raw_line, "\n", section)
+
+            section = section_name(line.text) or section
+            lines.append(line._replace(section=section))
+
+        newline = next((line.ending for line in lines if line.ending), os.linesep)
+
+        return cls(lines, encoding, newline)
+
+    def copy(self) -> "SkinIni":
+        """Return an independent copy of the document."""
+        return SkinIni(list(self.lines), self.encoding, self.newline)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the document in its original encoding."""
+        return "".join(line.text + line.ending for line in self.lines).encode(
+            self.encoding
+        )
+
+    def save(self, path: str) -> None:
+        """Write the document atomically through a temporary file and os.replace().
+
+        Args:
+            path: Path to write skin.ini to
+        """
+        temp_path = os.path.join(
+            os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp"
+        )
+        # Unlike mkstemp(), which makes the file private, this respects the umask
+        fd = os.open(
+            temp_path,
+            os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+            0o666,
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.to_bytes())
+            # Keep the permissions of the file being replaced
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def get_colors(self) -> list[tuple[int, int, int]]:
+        """Extract combo colors.
+
+        Returns:
+            List of RGB color tuples, or DEFAULT_COLORS if none found
+        """
+        colors = []
+
+        for line in self.lines:
+            text = line.text
+            if "Combo" not in text or is_commented(text, "Combo"):
+                continue
+
+            combo_part = text[text.find("Combo") + 5 :]
+
+            if not combo_part or not combo_part[0].isdigit():
+                continue
+
+            index = 1
+            while index < len(combo_part) and not combo_part[index].isdigit():
+                index += 1
+
+            color_string = combo_part[index:].strip()
+            color_values = color_string.split(",")
+            rgb_tuple = tuple(int(value.strip()[:3]) for value in color_values)
+            colors.append(rgb_tuple)
+
+        return list(DEFAULT_COLORS) if not colors else colors
+
+    def get_prefix(self) -> str:
+        """Extract hitcircle prefix.
+
+        Returns:
+            str: Hitcircle prefix, or "default" if not found
+        """
+        for line in self.lines:
+            if "HitCirclePrefix" in line.text and not is_commented(
+                line.text, "HitCirclePrefix"
+            ):
+                prefix = line.text.strip().split(":", 1)[1].strip()
+                return prefix.replace("\\", "/")
+
+        return "default"
+
+    def set_color(self, color: tuple[int, int, int]) -> None:
+        """Set single combo color and remove other combo colors.
+
+        Args:
+            color: RGB color tuple to set as Combo1
+        """
+        combo = f"Combo1: {color[0]}, {color[1]}, {color[2]}"
+        colours_section_found = False
+        new_lines = []
+
+        for line in self.lines:
+            if re.match(r"Combo\d+:", line.text.strip()) and not is_commented(
+                line.text, "Combo"
+            ):
+                continue
+
+            new_lines.append(line)
+            if section_name(line.text) == "Colours":
+                colours_section_found = True
+                new_lines.append(Line(combo, self.newline, "Colours"))
+
+        if not colours_section_found:
+            self._terminate_last_line(new_lines)
+            new_lines.append(Line("[Colours]", self.newline, "Colours"))
+            new_lines.append(Line(combo, self.newline, "Colours"))
+
+        self.lines = new_lines
+
+    def set_overlap(self, overlap: str) -> None:
+        """Set hitcircle overlap.
+
+        Args:
+            overlap: New overlap to set
+        """
+        overlap_line = f"HitCircleOverlap: {overlap}"
+
+        for i, line in enumerate(self.lines):
+            if "HitCircleOverlap" in line.text and "//" not in line.text:
+                self.lines[i] = line._replace(
+                    text=overlap_line, ending=line.ending or self.newline
+                )
+                return
+
+        for i, line in enumerate(self.lines):
+            if section_name(line.text) == "Fonts":
+                self.lines.insert(i + 1, Line(overlap_line, self.newline, "Fonts"))
+                return
+
+        if self.lines and not self.lines[-1].ending:
+            self._terminate_last_line(self.lines)
+        else:
+            section = self.lines[-1].section if self.lines else None
+            self.lines.append(Line("", self.newline, section))
+        self.lines.append(Line("[Fonts]", self.newline, "Fonts"))
+        self.lines.append(Line(overlap_line, self.newline, "Fonts"))
+
+    def add_header(self) -> None:
+        """Add the Instafader header comment at the top."""
+        if not any(HEADER in line.text for line in self.lines):
+            self.lines.insert(0, Line(HEADER, self.newline, None))
+
+    def _terminate_last_line(self, lines: list[Line]) -> None:
+        if lines and not lines[-1].ending:
+            lines[-1] = lines[-1]._replace(ending=self.newline)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_skin_ini(path: str, mtime_ns: int, size: int) -> SkinIni:
+    with open(path, "rb") as f:
+        return SkinIni.parse(f.read())
+
+
+def load_skin_ini(skin_folder: str) -> SkinIni:
+    """Parse a skin's skin.ini, reusing earlier parses of an unchanged file.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        SkinIni: Parsed document, safe to edit
+
+    Raises:
+        FileNotFoundError: If the skin has no skin.ini
+    """
+    path = os.path.join(skin_folder, "skin.ini")
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError("skin.ini not found")
+
+    return _parse_skin_ini(path, stat.st_mtime_ns, stat.st_size).copy()
@@ -0,0 +1,74 @@
+import os
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Memory budget in MiB applied when none is given, unbounded when unset
+MEMORY_BUDGET_ENV = "INSTAFADER_MEMORY_BUDGET"
+MIB = 1024 * 1024
+
+
+def default_budget() -> int | None:
+    """Return the memory budget in bytes set through the environment, if any."""
+    value = os.environ.get(MEMORY_BUDGET_ENV)
+    return int(value) * MIB if value else None
+
+
+def image_bytes(image: "Image.Image") -> int:
+    """Estimate the memory held by a decoded image from its size and bands."""
+    return image.width * image.height * len(image.getbands())
+
+
+def peak_rss() -> int | None:
+    """Return the peak resident set size of this process in bytes.
+
+    Returns:
+        int | None: Peak RSS, or None where the platform doesn't report it
+    """
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_windows() if sys.platform == "win32" else None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_rss_windows() -> int | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    psapi = ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [
+        wintypes.HANDLE,
+        ctypes.POINTER(ProcessMemoryCounters),
+        wintypes.DWORD,
+    ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(
+        kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+    ):
+        return None
+
+    return counters.PeakWorkingSetSize
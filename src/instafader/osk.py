@@ -0,0 +1,239 @@
+import copy
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+from collections.abc import Callable
+
+from . import encode, ini, pipeline, render, trace
+
+OUTPUT_SUFFIX = " (instafade)"
+ZIP64_EXTRA_ID = 0x0001
+
+
+def output_path_for(osk_path: str) -> str:
+    """Default path of the archive written for an instafaded .osk."""
+    stem, extension = os.path.splitext(osk_path)
+    return f"{stem}{OUTPUT_SUFFIX}{extension}"
+
+
+def find_root(members: dict[str, zipfile.ZipInfo]) -> str:
+    """Find the folder of an archive holding skin.ini, "" for the archive root.
+
+    Args:
+        members: Archive members by lowercase name
+
+    Returns:
+        str: Lowercase folder prefix ending in "/", or ""
+
+    Raises:
+        FileNotFoundError: If the archive has no skin.ini
+    """
+    candidates = [
+        name for name in members if name == "skin.ini" or name.endswith("/skin.ini")
+    ]
+    if not candidates:
+        raise FileNotFoundError("skin.ini not found")
+
+    return min(candidates, key=lambda name: name.count("/"))[: -len("skin.ini")]
+
+
+def strip_zip64_extra(extra: bytes) -> bytes:
+    """Remove ZIP64 fields from a member's extra data, they are rewritten on copy."""
+    fields = []
+    i = 0
+    while i + 4 <= len(extra):
+        field_id, size = struct.unpack("<HH", extra[i : i + 4])
+        if field_id != ZIP64_EXTRA_ID:
+            fields.append(extra[i : i + 4 + size])
+        i += 4 + size
+
+    return b"".join(fields)
+
+
+def copy_raw_member(source, info: zipfile.ZipInfo, target: zipfile.ZipFile) -> None:
+    """Copy a member's compressed bytes into another archive without recompressing.
+
+    Args:
+        source: Binary file object of the source archive
+        info: Member to copy
+        target: Archive open for writing
+    """
+    # Skip the member's local header, a fresh one is written with the sizes
+    # and CRC from the central directory instead of a trailing data descriptor
+    source.seek(info.header_offset)
+    header = source.read(30)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.seek(info.header_offset + 30 + name_length + extra_length)
+
+    copied = copy.copy(info)
+    copied.flag_bits &= ~0x08
+    copied.extra = strip_zip64_extra(info.extra)
+    copied.header_offset = target.fp.tell()
+    target.fp.write(copied.FileHeader(info.compress_size > zipfile.ZIP64_LIMIT))
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+
+    # What ZipFile.write() does after writing a member itself
+    target.filelist.append(copied)
+    target.NameToInfo[copied.filename] = copied
+    target.start_dir = target.fp.tell()
+
+
+def instafade_osk(
+    osk_path: str,
+    color: tuple[int, int, int] | None = None,
+    output_path: str | None = None,
+    progress: Callable[[float], None] | None = None,
+    encoder: encode.Encoder | None = None,
+    trim: bool = False,
+) -> str:
+    """Instafade a skin archive into a new .osk, leaving the original untouched.
+
+    Only skin.ini, the hitcircle, overlay and numbers are decompressed. Every
+    other member is copied into the new archive as is, without recompression.
+
+    Args:
+        osk_path: Path to the .osk file
+        color: RGB color tuple to tint the hitcircle with, defaults to the
+            skin's first combo color
+        output_path: Path of the new archive, defaults to output_path_for()
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+        encoder: Encoder to save the images with, its results then list every
+            file written. Defaults to a new one using the default profile
+        trim: Whether to crop the transparent padding around the numbers
+
+    Returns:
+        str: Path of the new archive
+
+    Raises:
+        FileNotFoundError: If the archive lacks skin.ini or a needed element
+    """
+    if encoder is None:
+        with encode.Encoder() as encoder:
+            return instafade_osk(osk_path, color, output_path, progress, encoder, trim)
+
+    def report(value: float) -> None:
+        if progress:
+            progress(value)
+
+    output_path = output_path or output_path_for(osk_path)
+    report(0)
+
+    with tempfile.TemporaryDirectory(
+        prefix="instafader-osk-"
+    ) as work_dir, zipfile.ZipFile(osk_path) as archive:
+        members = {
+            info.filename.lower(): info
+            for info in archive.infolist()
+            if not info.is_dir()
+        }
+        root = find_root(members)
+
+        def extract(relative_path: str) -> bool:
+            info = members.get(root + relative_path.lower())
+            if info is None:
+                return False
+
+            path = os.path.join(work_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with archive.open(info) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            return True
+
+        with trace.span("extract"):
+            extract("skin.ini")
+            skin_ini = ini.load_skin_ini(work_dir)
+            prefix = skin_ini.get_prefix()
+            color = color or skin_ini.get_colors()[0]
+            for basename in ["hitcircle", "hitcircleoverlay"] + [
+                f"{prefix}-{i}" for i in range(10)
+            ]:
+                if not extract(f"{basename}@2x.png"):
+                    extract(f"{basename}.png")
+        report(0.2)
+
+        with pipeline.load_elements(work_dir, prefix) as elements:
+            circle = render.render_circle(
+                elements.hitcircle,
+                elements.hitcircle_hd,
+                elements.hitcircleoverlay,
+                elements.hitcircleoverlay_hd,
+                color,
+            )
+            elements.close_circle_elements()
+            overlap = pipeline.write_outputs(
+                work_dir,
+                elements,
+                circle,
+                encoder,
+                lambda done: report(0.2 + done * 0.4),
+                trim=trim,
+            )
+            circle.close()
+        written = encoder.wait()
+
+        skin_ini.set_overlap(overlap)
+        skin_ini.set_color(color)
+        skin_ini.add_header()
+        skin_ini.save(os.path.join(work_dir, "skin.ini"))
+        report(0.7)
+
+        # Generated files by lowercase name, osu! matches names case-insensitively
+        generated = {
+            relative_path.lower(): relative_path
+            for relative_path in [
+                os.path.relpath(result.path, work_dir).replace(os.sep, "/")
+                for result in written
+            ]
+            + ["skin.ini"]
+        }
+        removed = {file_name.lower() for file_name in pipeline.SLIDERSTARTCIRCLE_FILES}
+
+        # Write next to the destination and move it in place once complete
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(output_path)), suffix=".tmp"
+        )
+        try:
+            with trace.span("write_osk"), os.fdopen(fd, "w+b") as f, open(
+                osk_path, "rb"
+            ) as source, zipfile.ZipFile(f, "w") as target:
+                for info in archive.infolist():
+                    name = info.filename.lower()
+                    relative_path = name[len(root) :] if name.startswith(root) else None
+                    if relative_path in removed:
+                        continue
+
+                    if relative_path in generated:
+                        target.write(
+                            os.path.join(work_dir, generated.pop(relative_path)),
+                            info.filename,
+                            info.compress_type,
+                        )
+                    else:
+                        copy_raw_member(source, info, target)
+
+                # Outputs the original archive had no member for
+                for relative_path in sorted(generated.values()):
+                    target.write(
+                        os.path.join(work_dir, relative_path),
+                        root + relative_path,
+                        zipfile.ZIP_DEFLATED,
+                    )
+            # mkstemp() makes the file private, give it the source's permissions
+            shutil.copymode(osk_path, temp_path)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    report(1.0)
+
+    return output_path
@@ -0,0 +1,770 @@
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from PIL import Image
+
+from . import (
+    backup,
+    cache,
+    encode,
+    fingerprint,
+    ini,
+    memory,
+    render,
+    skin,
+    trace,
+    transaction,
+)
+
+# Bump whenever a change alters the rendered output, so earlier runs are redone
+PIPELINE_VERSION = 1
+DIGITS = range(1, 10)
+DIGIT_WORKERS = min(9, os.cpu_count() or 1)
+VARIANTS_FOLDER = "instafader-variants"
+SLIDERSTARTCIRCLE_FILES = [
+    "sliderstartcircle.png",
+    "sliderstartcircle@2x.png",
+    "sliderstartcircleoverlay.png",
+    "sliderstartcircleoverlay@2x.png",
+]
+
+
+@dataclass
+class SkinElements:
+    """Decoded source elements of a skin."""
+
+    prefix: str
+    hitcircle: Image.Image
+    hitcircle_hd: bool
+    hitcircleoverlay: Image.Image
+    hitcircleoverlay_hd: bool
+    numbers: dict[int, tuple[Image.Image, bool]]
+    default_0_hd: bool
+
+    @property
+    def circle_hd(self) -> bool:
+        """Whether the circle is built from HD elements."""
+        return self.hitcircle_hd or self.hitcircleoverlay_hd
+
+    def close_circle_elements(self) -> None:
+        """Free the hitcircle and overlay, once every circle is rendered."""
+        self.hitcircle.close()
+        self.hitcircleoverlay.close()
+
+    def close(self) -> None:
+        """Free every decoded element."""
+        self.close_circle_elements()
+        for number, _ in self.numbers.values():
+            number.close()
+
+    def __enter__(self) -> "SkinElements":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def find_elements(skin_folder: str, prefix: str) -> dict[str, tuple[str, bool]]:
+    """Find the files of the hitcircle, overlay and numbers 0-9 of a skin.
+
+    Args:
+        skin_folder: Path to the skin folder
+        prefix: Hitcircle prefix
+
+    Returns:
+        dict: Base name of each element mapped to (path, bool indicating if HD)
+
+    Raises:
+        FileNotFoundError: If an element exists in neither HD nor SD version
+    """
+    basenames = ["hitcircle", "hitcircleoverlay"] + [f"{prefix}-{i}" for i in range(10)]
+    return {
+        basename: skin.find_skin_element(skin_folder, basename)
+        for basename in basenames
+    }
+
+
+@trace.traced("load_elements")
+def load_elements(
+    skin_folder: str,
+    prefix: str,
+    digits: range | list[int] = DIGITS,
+    sources: dict[str, str] | None = None,
+) -> SkinElements:
+    """Decode the hitcircle, overlay and numbers of a skin.
+
+    Args:
+        skin_folder: Path to the skin folder
+        prefix: Hitcircle prefix
+        digits: Numbers to decode
+        sources: Paths to decode instead of the skin's files, by base name
+
+    Returns:
+        SkinElements: Decoded elements
+
+    Raises:
+        FileNotFoundError: If an element exists in neither HD nor SD version
+    """
+    sources = sources or {}
+    basenames = ["hitcircle", "hitcircleoverlay"] + [f"{prefix}-{i}" for i in digits]
+    with ThreadPoolExecutor(max_workers=DIGIT_WORKERS) as executor:
+        loaded = list(
+            executor.map(
+                lambda basename: skin.load_skin_element(
+                    skin_folder, basename, source=sources.get(basename)
+                ),
+                basenames,
+            )
+        )
+
+    # The zero is replaced by a blank image, only its name is needed
+    _, default_0_hd = skin.find_skin_element(skin_folder, f"{prefix}-0")
+
+    (hitcircle, hitcircle_hd), (hitcircleoverlay, hitcircleoverlay_hd) = loaded[:2]
+
+    return SkinElements(
+        prefix,
+        hitcircle,
+        hitcircle_hd,
+        hitcircleoverlay,
+        hitcircleoverlay_hd,
+        dict(zip(digits, loaded[2:])),
+        default_0_hd,
+    )
+
+
+@trace.traced("render_digit")
+def render_digit(
+    elements: SkinElements, digit: int, circle: Image.Image
+) -> Image.Image:
+    """Render one numbered hitcircle.
+
+    Args:
+        elements: Decoded skin elements
+        digit: Digit to render (1-9)
+        circle: Composited circle, left untouched
+
+    Returns:
+        Image.Image: Rendered image
+    """
+    number, number_hd = elements.numbers[digit]
+    return render.add_number(circle.copy(), number, number_hd, elements.circle_hd)
+
+
+@trace.traced("write_outputs")
+def write_outputs(
+    output_folder: str,
+    elements: SkinElements,
+    circle: Image.Image,
+    encoder: encode.Encoder,
+    progress: Callable[[float], None] | None = None,
+    digits: range | list[int] = DIGITS,
+    blanks: bool = True,
+    previous_folder: str | None = None,
+    trim: bool = False,
+) -> str:
+    """Render the numbered hitcircles, the blank zero and the blank hitcircle.
+
+    The images are queued on the encoder, call its wait() before relying on
+    the files.
+
+    Args:
+        output_folder: Folder to save into, using the skin's relative paths
+        elements: Decoded skin elements
+        circle: Composited circle
+        encoder: Encoder saving the images
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+        digits: Numbers to render, the others are left as an earlier run saved them
+        blanks: Whether to save the blank zero, hitcircle and overlay, which can
+            be skipped when an earlier run saved them for the same digit 9
+        previous_folder: Folder holding the numbers an earlier run saved, for
+            those not already in output_folder
+        trim: Whether to crop the transparent padding around the numbers, the
+            blank zero and the overlap then follow the cropped 9
+
+    Returns:
+        str: HitCircleOverlap value matching the saved images
+    """
+    prefix = elements.prefix
+
+    # Create output directory if it doesn't exist
+    os.makedirs(os.path.join(output_folder, os.path.dirname(prefix)), exist_ok=True)
+
+    # Every digit is rendered from the same in-memory circle. Pillow releases
+    # the GIL while pasting and resizing, so threads scale, and each finished
+    # image is encoded while the others are still rendering. Only the encoder
+    # keeps a reference to a rendered image, freeing it once written.
+    def render_and_save(digit: int) -> tuple[int, int]:
+        no_number = render_digit(elements, digit, circle)
+        if trim:
+            no_number = render.trim_transparent(no_number)
+        number_hd = elements.numbers[digit][1]
+        encoder.save(
+            no_number,
+            os.path.join(
+                output_folder, f"{prefix}-{digit}{'@2x' if number_hd else ''}.png"
+            ),
+        )
+        return no_number.size
+
+    workers = DIGIT_WORKERS
+    if encoder.memory_budget:
+        # Half the budget is left to the images being rendered
+        workers = max(
+            1, min(workers, encoder.memory_budget // 2 // memory.image_bytes(circle))
+        )
+
+    sizes = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_and_save, i): i for i in digits}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                sizes[futures[future]] = future.result()
+                if progress:
+                    progress(done / (len(digits) + 1))
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+    # The last digit decides the size of the blank zero and the overlap
+    if 9 in sizes:
+        x, y = sizes[9]
+        number_hd = elements.numbers[9][1]
+    else:
+        # A 9 copied from the render cache is already in the output folder
+        try:
+            path, number_hd = skin.find_skin_element(output_folder, f"{prefix}-9")
+        except FileNotFoundError:
+            if previous_folder is None:
+                raise
+            path, number_hd = skin.find_skin_element(previous_folder, f"{prefix}-9")
+        with Image.open(path) as image:
+            x, y = image.size
+
+    if blanks:
+        default_0 = Image.new("RGBA", (x, y), (255, 255, 255, 0))
+        encoder.save(
+            default_0,
+            os.path.join(
+                output_folder,
+                f"{prefix}-0{'@2x' if elements.default_0_hd else ''}.png",
+            ),
+        )
+
+        blank_image = Image.new("RGBA", (1, 1), (255, 255, 255, 0))
+        encoder.save(
+            blank_image,
+            os.path.join(
+                output_folder,
+                f"hitcircle{'@2x' if elements.hitcircle_hd else ''}.png",
+            ),
+        )
+        encoder.save(
+            blank_image,
+            os.path.join(
+                output_folder,
+                f"hitcircleoverlay{'@2x' if elements.hitcircleoverlay_hd else ''}.png",
+            ),
+        )
+    if progress:
+        progress(1.0)
+
+    return str(x // 2 if number_hd else x)
+
+
+@dataclass
+class Operation:
+    """A change an instafade makes to a skin, with its estimated cost."""
+
+    action: str
+    relative_path: str
+    # Pixels to render, and bytes to copy or remove
+    pixels: int = 0
+    size: int = 0
+
+
+@dataclass
+class InstafadePlan:
+    """What an instafade of a skin does, worked out without changing the skin."""
+
+    skin_folder: str
+    color: tuple[int, int, int]
+    prefix: str
+    skin_ini: ini.SkinIni
+    relative_paths: dict[str, str]
+    previous: dict | None
+    inputs: dict[str, str | None]
+    current: dict[str, str | None]
+    digit_keys: dict[str, str]
+    run_key: str
+    digits: list[int]
+    blanks: bool
+    render_keys: dict[int, str] = field(default_factory=dict)
+    cached: list[int] = field(default_factory=list)
+
+    @property
+    def up_to_date(self) -> bool:
+        """Whether the skin is as an earlier run with the same inputs left it."""
+        return (
+            bool(self.previous)
+            and self.previous["fingerprint"] == self.run_key
+            and self.current == self.previous["outputs"]
+        )
+
+    def source(self, basename: str) -> str:
+        """Path to the original contents of an element, in the store if replaced."""
+        relative_path = self.relative_paths[basename]
+        if self.inputs[relative_path] != self.current[relative_path]:
+            return backup.object_path(self.skin_folder, self.inputs[relative_path])
+
+        return os.path.join(self.skin_folder, relative_path)
+
+    def operations(
+        self, render_cache: cache.RenderCache | None = None
+    ) -> list[Operation]:
+        """List the changes the instafade makes, reading only image headers.
+
+        Args:
+            render_cache: Cache the plan was made with, to size its copies
+
+        Returns:
+            list[Operation]: Changes in the order they are made
+        """
+        if self.up_to_date:
+            return []
+
+        def header_size(basename: str) -> tuple[int, int]:
+            with Image.open(self.source(basename)) as image:
+                return image.size
+
+        # The circle is the size of the overlay as scaled to match the hitcircle
+        hitcircle_hd = self.relative_paths["hitcircle"].endswith("@2x.png")
+        overlay_hd = self.relative_paths["hitcircleoverlay"].endswith("@2x.png")
+        scale = render.calculate_resize_factor(overlay_hd, hitcircle_hd)
+        width, height = header_size("hitcircleoverlay")
+        circle = int(width * scale) * int(height * scale)
+
+        operations = []
+        for i in self.digits:
+            width, height = header_size(f"{self.prefix}-{i}")
+            operations.append(
+                Operation(
+                    "render",
+                    self.relative_paths[f"{self.prefix}-{i}"],
+                    pixels=max(circle, width * height),
+                )
+            )
+        for i in self.cached:
+            operations.append(
+                Operation(
+                    "copy",
+                    self.relative_paths[f"{self.prefix}-{i}"],
+                    size=os.path.getsize(render_cache.entry_path(self.render_keys[i])),
+                )
+            )
+        if self.blanks:
+            for basename in ["hitcircle", "hitcircleoverlay", f"{self.prefix}-0"]:
+                operations.append(Operation("blank", self.relative_paths[basename]))
+        operations.append(Operation("update", "skin.ini"))
+        for file_name in SLIDERSTARTCIRCLE_FILES:
+            path = os.path.join(self.skin_folder, file_name)
+            if os.path.exists(path):
+                operations.append(
+                    Operation("remove", file_name, size=os.path.getsize(path))
+                )
+
+        return operations
+
+
+def plan_instafade(
+    skin_folder: str,
+    color: tuple[int, int, int],
+    prefix: str | None = None,
+    profile: str | None = None,
+    render_cache: cache.RenderCache | None = None,
+    trim: bool = False,
+    palette: float | None = None,
+) -> InstafadePlan:
+    """Work out what an instafade of a skin does, reading but not changing it.
+
+    Args:
+        skin_folder: Path to the skin folder
+        color: RGB color tuple to tint the hitcircle with
+        prefix: Hitcircle prefix, read from skin.ini when not given
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        render_cache: Cache shared with other skins, if any
+        trim: Whether the numbers are cropped to their visible content
+        palette: Largest error of palette images, see encode.save_png()
+
+    Returns:
+        InstafadePlan: Plan of the instafade
+    """
+    profile = profile or encode.PROFILE
+    # Optional output formats get keys of their own, the default one keeps
+    # the keys of earlier runs
+    output_format = profile
+    if trim:
+        output_format = [output_format, "trim"]
+    if palette is not None:
+        output_format = [output_format, "palette", palette]
+    skin_ini = ini.load_skin_ini(skin_folder)
+    if prefix is None:
+        prefix = skin_ini.get_prefix()
+
+    relative_paths = {
+        basename: os.path.relpath(path, skin_folder).replace(os.sep, "/")
+        for basename, (path, _) in find_elements(skin_folder, prefix).items()
+    }
+    previous = fingerprint.read_fingerprint(skin_folder)
+    inputs, current = fingerprint.resolve_inputs(
+        skin_folder,
+        ["skin.ini", *relative_paths.values(), *SLIDERSTARTCIRCLE_FILES],
+        previous,
+    )
+
+    circle_key = fingerprint.fingerprint(
+        PIPELINE_VERSION,
+        output_format,
+        color,
+        [inputs[relative_paths[b]] for b in ("hitcircle", "hitcircleoverlay")],
+        [relative_paths[b] for b in ("hitcircle", "hitcircleoverlay")],
+    )
+    digit_keys = {
+        str(i): fingerprint.fingerprint(
+            circle_key,
+            relative_paths[f"{prefix}-{i}"],
+            inputs[relative_paths[f"{prefix}-{i}"]],
+        )
+        for i in DIGITS
+    }
+    run_key = fingerprint.fingerprint(circle_key, prefix, inputs)
+
+    def saved_before(basename: str) -> bool:
+        relative_path = relative_paths[basename]
+        return bool(previous) and current[relative_path] == previous["outputs"].get(
+            relative_path
+        )
+
+    # A number is kept if its file is still the one saved from the same inputs
+    digits = [
+        i
+        for i in DIGITS
+        if not saved_before(f"{prefix}-{i}")
+        or previous["digits"].get(str(i)) != digit_keys[str(i)]
+    ]
+    # The blanks only depend on the names of the elements and the size of the 9
+    blanks = 9 in digits or not all(
+        saved_before(basename)
+        for basename in ["hitcircle", "hitcircleoverlay", f"{prefix}-0"]
+    )
+
+    plan = InstafadePlan(
+        skin_folder,
+        color,
+        prefix,
+        skin_ini,
+        relative_paths,
+        previous,
+        inputs,
+        current,
+        digit_keys,
+        run_key,
+        digits,
+        blanks,
+    )
+    if render_cache and not plan.up_to_date:
+        # Unlike the digit keys, only contents count, not the skin's file names
+        for i in digits:
+            plan.render_keys[i] = fingerprint.fingerprint(
+                PIPELINE_VERSION,
+                output_format,
+                render.ENGINE,
+                color,
+                [
+                    (
+                        inputs[relative_paths[basename]],
+                        relative_paths[basename].endswith("@2x.png"),
+                    )
+                    for basename in ["hitcircle", "hitcircleoverlay", f"{prefix}-{i}"]
+                ],
+            )
+        plan.cached = [
+            i
+            for i in digits
+            if os.path.exists(render_cache.entry_path(plan.render_keys[i]))
+        ]
+        plan.digits = [i for i in digits if i not in plan.cached]
+
+    return plan
+
+
+def instafade_skin(
+    skin_folder: str,
+    color: tuple[int, int, int],
+    prefix: str | None = None,
+    progress: Callable[[float], None] | None = None,
+    encoder: encode.Encoder | None = None,
+    render_cache: cache.RenderCache | None = None,
+    trim: bool = False,
+) -> str:
+    """Instafade a skin folder.
+
+    A skin left as an earlier run with the same color saved it is skipped,
+    otherwise only the numbers whose inputs changed are rendered again. The
+    original elements of an already instafaded skin are read back from its
+    backup store. With a render cache, numbers any skin already rendered from
+    the same elements, color and profile are copied instead of rendered.
+
+    Every output is staged in the store and the skin only changes once all of
+    them are ready, in a single transaction. A run interrupted at any point
+    leaves either the skin as it was, or a committed transaction finished by
+    the next run.
+
+    Args:
+        skin_folder: Path to the skin folder
+        color: RGB color tuple to tint the hitcircle with
+        prefix: Hitcircle prefix, read from skin.ini when not given
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+        encoder: Encoder to save the images with, its results then list every
+            file written. Defaults to a new one using the default profile
+        render_cache: Cache shared with other skins, e.g. cache.default_cache()
+        trim: Whether to crop the transparent padding around the numbers
+
+    Returns:
+        str: Path to the manifest of the backup snapshot of the skin's original files
+    """
+    if encoder is None:
+        with encode.Encoder() as encoder:
+            return instafade_skin(
+                skin_folder, color, prefix, progress, encoder, render_cache, trim
+            )
+
+    def report(value: float) -> None:
+        if progress:
+            progress(value)
+
+    report(0)
+
+    # Another run on the same skin, e.g. a watch, finishes first
+    with transaction.SkinLock(skin_folder):
+        transaction.recover(skin_folder)
+        plan = plan_instafade(
+            skin_folder,
+            color,
+            prefix,
+            encoder.profile,
+            render_cache,
+            trim,
+            encoder.palette,
+        )
+        if plan.up_to_date:
+            report(1.0)
+            return backup.store_path(
+                skin_folder, "snapshots", f"{plan.previous['snapshot']}.json"
+            )
+        prefix = plan.prefix
+        relative_paths = plan.relative_paths
+
+        with trace.span("backup"):
+            snapshot = backup.Snapshot(skin_folder)
+            for relative_path, digest in plan.inputs.items():
+                if digest:
+                    snapshot.add(relative_path, digest)
+        report(0.2)
+
+        with transaction.Transaction(skin_folder) as staged:
+            digits = list(plan.digits)
+            copied = []
+            for i in plan.cached:
+                path = staged.path(relative_paths[f"{prefix}-{i}"])
+                # Evicted since the plan was made
+                if not render_cache.get(plan.render_keys[i], path):
+                    digits.append(i)
+                    continue
+                copied.append(
+                    encode.EncodeResult(path, 0, os.path.getsize(path), cached=True)
+                )
+            digits.sort()
+
+            sources = {
+                basename: plan.source(basename)
+                for basename, relative_path in relative_paths.items()
+                if plan.inputs[relative_path] != plan.current[relative_path]
+            }
+            # Each decoded image is freed as soon as the stages needing it are done
+            with load_elements(skin_folder, prefix, digits, sources) as elements:
+                report(0.4)
+
+                circle = render.render_circle(
+                    elements.hitcircle,
+                    elements.hitcircle_hd,
+                    elements.hitcircleoverlay,
+                    elements.hitcircleoverlay_hd,
+                    color,
+                )
+                elements.close_circle_elements()
+                report(0.5)
+
+                overlap = write_outputs(
+                    staged.directory,
+                    elements,
+                    circle,
+                    encoder,
+                    lambda done: report(0.5 + done * 0.3),
+                    digits,
+                    plan.blanks,
+                    skin_folder,
+                    trim,
+                )
+                circle.close()
+            written = encoder.wait() + copied
+
+            if render_cache:
+                with trace.span("cache_store"):
+                    for i in digits:
+                        render_cache.put(
+                            plan.render_keys[i],
+                            staged.path(relative_paths[f"{prefix}-{i}"]),
+                        )
+            report(0.9)
+
+            for file_name in SLIDERSTARTCIRCLE_FILES:
+                staged.remove(file_name)
+
+            with trace.span("skin.ini"):
+                skin_ini = plan.skin_ini
+                original_ini = skin_ini.to_bytes()
+                skin_ini.set_overlap(overlap)
+                skin_ini.set_color(color)
+                skin_ini.add_header()
+                # Rewriting an unchanged file would only disturb editors and watchers
+                if skin_ini.to_bytes() != original_ini:
+                    skin_ini.save(staged.path("skin.ini"))
+
+            def output_digest(relative_path: str) -> str | None:
+                if relative_path in staged.removals:
+                    return None
+                staged_path = os.path.join(staged.directory, relative_path)
+                if os.path.exists(staged_path):
+                    return fingerprint.file_digest(staged_path)
+                return plan.current[relative_path]
+
+            backup.write_json(
+                staged.path(
+                    os.path.relpath(
+                        fingerprint.fingerprint_path(skin_folder), skin_folder
+                    )
+                ),
+                {
+                    "version": PIPELINE_VERSION,
+                    "fingerprint": plan.run_key,
+                    "snapshot": snapshot.name,
+                    "digits": plan.digit_keys,
+                    "inputs": plan.inputs,
+                    "outputs": {
+                        relative_path: output_digest(relative_path)
+                        for relative_path in plan.inputs
+                    },
+                },
+            )
+
+            # Listed as the latest backup only once the outputs are in place
+            manifest_path = snapshot.save(staged.directory)
+
+            # Progress callbacks may cancel, which must not happen once the skin
+            # has changed, so the last one comes before the commit
+            report(1.0)
+            staged.commit(plan.current)
+
+        # Report the files where they ended up rather than where they were staged
+        for result in written:
+            result.path = os.path.join(
+                skin_folder, os.path.relpath(result.path, staged.directory)
+            )
+        if copied:
+            encoder.results.extend(copied)
+
+        return manifest_path
+
+
+def variant_name(color: tuple[int, int, int]) -> str:
+    """Folder name of the output set rendered for a color."""
+    return "-".join(str(component) for component in color)
+
+
+def render_variants(
+    skin_folder: str,
+    colors: list[tuple[int, int, int]],
+    output_dir: str,
+    prefix: str | None = None,
+    progress: Callable[[float], None] | None = None,
+    encoder: encode.Encoder | None = None,
+    trim: bool = False,
+) -> list[str]:
+    """Render a complete instafade output set for each color.
+
+    The skin itself is left untouched. Elements are decoded once and the
+    overlay is resized once, only the tint and composites run per color. Each
+    set is written to its own folder along with an edited copy of skin.ini,
+    ready to be copied over the skin.
+
+    Args:
+        skin_folder: Path to the skin folder
+        colors: RGB color tuples to render
+        output_dir: Folder receiving one subfolder per color
+        prefix: Hitcircle prefix, read from skin.ini when not given
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+        encoder: Encoder to save the images with, its results then list every
+            file written. Defaults to a new one using the default profile
+        trim: Whether to crop the transparent padding around the numbers
+
+    Returns:
+        list[str]: Paths of the output folders, in the order of colors
+    """
+    if encoder is None:
+        with encode.Encoder() as encoder:
+            return render_variants(
+                skin_folder, colors, output_dir, prefix, progress, encoder, trim
+            )
+    skin_ini = ini.load_skin_ini(skin_folder)
+    if prefix is None:
+        prefix = skin_ini.get_prefix()
+
+    with load_elements(skin_folder, prefix) as elements:
+        if progress:
+            progress(0.2)
+
+        circles = render.render_circles(
+            elements.hitcircle,
+            elements.hitcircle_hd,
+            elements.hitcircleoverlay,
+            elements.hitcircleoverlay_hd,
+            colors,
+        )
+
+        output_folders = []
+        for i, (color, circle) in enumerate(zip(colors, circles)):
+            output_folder = os.path.join(output_dir, variant_name(color))
+            os.makedirs(output_folder, exist_ok=True)
+
+            # Encoding this color overlaps with rendering the next one
+            overlap = write_outputs(output_folder, elements, circle, encoder, trim=trim)
+            circle.close()
+
+            variant_ini = skin_ini.copy()
+            variant_ini.set_overlap(overlap)
+            variant_ini.set_color(color)
+            variant_ini.add_header()
+            variant_ini.save(os.path.join(output_folder, "skin.ini"))
+
+            output_folders.append(output_folder)
+            if progress:
+                progress(0.2 + (i + 1) / len(colors) * 0.7)
+
+    encoder.wait()
+    if progress:
+        progress(1.0)
+
+    return output_folders
@@ -0,0 +1,193 @@
+import math
+from collections.abc import Callable
+
+from PIL import Image
+
+from . import render, skin, trace
+
+# Side of the square the window shows previews in
+PREVIEW_SIZE = 195
+
+
+def preview_scale(
+    hitcircle_path: str,
+    hitcircle_scale: float,
+    hitcircleoverlay_path: str,
+    hitcircleoverlay_scale: float,
+    number_path: str,
+    number_scale: float,
+    size: int,
+) -> float:
+    """Find the factor shrinking a full resolution preview to fit a square.
+
+    Only the image headers are read.
+
+    Args:
+        hitcircle_path: Path to the hitcircle
+        hitcircle_scale: Factor the hitcircle is resized by when rendering
+        hitcircleoverlay_path: Path to the hitcircleoverlay
+        hitcircleoverlay_scale: Factor the overlay is resized by when rendering
+        number_path: Path to the number
+        number_scale: Factor the number is resized by when rendering
+        size: Side of the square to fit in
+
+    Returns:
+        float: Scale factor, at most 1
+    """
+    largest = 1
+    for path, scale in [
+        (hitcircle_path, hitcircle_scale),
+        (hitcircleoverlay_path, hitcircleoverlay_scale),
+        (number_path, number_scale),
+    ]:
+        with Image.open(path) as image:
+            largest = max(largest, max(image.size) * scale)
+
+    return min(1.0, size / largest)
+
+
+@trace.traced("render_previews")
+def render_previews(
+    skin_folder: str,
+    prefix: str,
+    colors: list[tuple[int, int, int]],
+    size: int | None = None,
+    progress: Callable[[float], None] | None = None,
+) -> list[Image.Image]:
+    """Render the instafaded "1" of a skin for each color, entirely in memory.
+
+    Decoded elements and the resized overlay come from the element cache, so
+    only the tint and composites run per color.
+
+    With a size, a low-fidelity preview is rendered instead: the elements are
+    shrunk to preview size as they are decoded and every later resize uses a
+    cheaper filter, so the cost barely depends on the skin's texture size.
+    Files written to the skin are always rendered at full quality.
+
+    Args:
+        skin_folder: Path to the skin folder
+        prefix: Hitcircle prefix
+        colors: RGB color tuples to tint the hitcircle with
+        size: Side of the square a low-fidelity preview fits in, or None for
+            full resolution
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+
+    Returns:
+        list[Image.Image]: Preview images, in the order of colors
+    """
+    hitcircle_path, hitcircle_hd = skin.find_skin_element(skin_folder, "hitcircle")
+    hitcircleoverlay_path, hitcircleoverlay_hd = skin.find_skin_element(
+        skin_folder, "hitcircleoverlay"
+    )
+    number_path, number_hd = skin.find_skin_element(skin_folder, f"{prefix}-1")
+    circle_hd = hitcircle_hd or hitcircleoverlay_hd
+
+    hitcircle_scale = render.calculate_resize_factor(hitcircle_hd, hitcircleoverlay_hd)
+    hitcircleoverlay_scale = render.calculate_resize_factor(
+        hitcircleoverlay_hd, hitcircle_hd
+    )
+
+    if size is None:
+        resample = Image.Resampling.LANCZOS
+        hitcircle = skin.decode_element(hitcircle_path)
+        hitcircleoverlay = skin.decode_element(
+            hitcircleoverlay_path, hitcircleoverlay_scale
+        )
+        number = skin.decode_element(number_path)
+    else:
+        resample = Image.Resampling.BILINEAR
+        scale = preview_scale(
+            hitcircle_path,
+            hitcircle_scale,
+            hitcircleoverlay_path,
+            hitcircleoverlay_scale,
+            number_path,
+            2 if circle_hd and not number_hd else 1,
+            size,
+        )
+        hitcircle = skin.decode_preview_element(hitcircle_path, scale)
+        hitcircleoverlay = skin.decode_preview_element(
+            hitcircleoverlay_path, hitcircleoverlay_scale * scale
+        )
+        number = skin.decode_preview_element(number_path, scale)
+
+    previews = []
+    for i, color in enumerate(colors):
+        circle = render.create_composite_image(
+            render.resize_element(
+                render.tint(hitcircle, color), hitcircle_scale, resample
+            ),
+            hitcircleoverlay,
+        )
+        previews.append(
+            render.add_number(circle, number, number_hd, circle_hd, resample)
+        )
+        if progress:
+            progress((i + 1) / len(colors))
+
+    return previews
+
+
+def render_preview(
+    skin_folder: str,
+    prefix: str,
+    color: tuple[int, int, int],
+    size: int | None = None,
+    progress: Callable[[float], None] | None = None,
+) -> Image.Image:
+    """Render the instafaded "1" of a skin entirely in memory.
+
+    Args:
+        skin_folder: Path to the skin folder
+        prefix: Hitcircle prefix
+        color: RGB color tuple to tint the hitcircle with
+        size: Side of the square a low-fidelity preview fits in, or None for
+            full resolution
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+
+    Returns:
+        Image.Image: Preview image
+    """
+    return render_previews(skin_folder, prefix, [color], size, progress)[0]
+
+
+def render_preview_grid(
+    skin_folder: str,
+    prefix: str,
+    colors: list[tuple[int, int, int]],
+    size: int | None = None,
+    progress: Callable[[float], None] | None = None,
+) -> Image.Image:
+    """Render the previews of every color side by side in a square grid.
+
+    Args:
+        skin_folder: Path to the skin folder
+        prefix: Hitcircle prefix
+        colors: RGB color tuples to tint the hitcircle with
+        size: Side of the square a low-fidelity grid fits in, or None for
+            full resolution previews
+        progress: Optional callback receiving the completed fraction (0.0-1.0)
+
+    Returns:
+        Image.Image: Grid of preview images
+    """
+    columns = math.ceil(math.sqrt(len(colors)))
+    previews = render_previews(
+        skin_folder,
+        prefix,
+        colors,
+        None if size is None else max(1, size // columns),
+        progress,
+    )
+
+    # As many rows as columns even when the last ones stay empty, the preview
+    # is shown in a square
+    cell = max(max(preview.size) for preview in previews)
+
+    grid = Image.new("RGBA", (columns * cell, columns * cell), (0, 0, 0, 0))
+    for i, preview in enumerate(previews):
+        x = (i % columns) * cell + (cell - preview.width) // 2
+        y = (i // columns) * cell + (cell - preview.height) // 2
+        grid.paste(preview, (x, y))
+
+    return grid
@@ -0,0 +1,190 @@
+import os
+import struct
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from . import backup, batch, fingerprint, ini, render, skin
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Scanning waits on the disk rather than the CPU
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+@dataclass
+class ElementInfo:
+    """File and size of one skin element, read from its PNG header."""
+
+    path: str
+    hd: bool
+    width: int
+    height: int
+
+
+@dataclass
+class SkinInfo:
+    """Properties of a skin, read without decoding any image."""
+
+    skin_folder: str
+    prefix: str | None = None
+    colors: list[tuple[int, int, int]] = field(default_factory=list)
+    elements: dict[str, ElementInfo] = field(default_factory=dict)
+    overlap: str | None = None
+    instafaded: bool = False
+    error: str | None = None
+
+
+def read_png_size(path: str) -> tuple[int, int]:
+    """Read the size of a PNG image from its IHDR chunk, without decoding it.
+
+    Args:
+        path: Path to the image
+
+    Returns:
+        tuple[int, int]: Width and height
+
+    Raises:
+        ValueError: If the file is not a PNG image
+    """
+    with open(path, "rb") as f:
+        header = f.read(24)
+
+    # The signature is followed by the IHDR chunk: length, type, width, height
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError(f"Not a PNG image: {path}")
+
+    return struct.unpack(">II", header[16:24])
+
+
+def predict_overlap(
+    hitcircle: ElementInfo, hitcircleoverlay: ElementInfo, number: ElementInfo
+) -> str:
+    """Work out the HitCircleOverlap an instafade sets from element sizes alone.
+
+    Mirrors the rendering of the 9: the circle takes the size of the scaled
+    overlay, and a larger number widens the image.
+
+    Args:
+        hitcircle: Hitcircle element
+        hitcircleoverlay: Hitcircleoverlay element
+        number: Element of the 9
+
+    Returns:
+        str: HitCircleOverlap value
+    """
+    scale = render.calculate_resize_factor(hitcircleoverlay.hd, hitcircle.hd)
+    circle = (
+        int(hitcircleoverlay.width * scale),
+        int(hitcircleoverlay.height * scale),
+    )
+    x = number.width if (number.width, number.height) > circle else circle[0]
+
+    return str(x // 2 if number.hd else x)
+
+
+def scan_skin(skin_folder: str) -> SkinInfo:
+    """Read a skin's skin.ini and the headers of its elements.
+
+    For an instafaded skin, the elements still as the last instafade left them
+    are read from the originals kept in its backup store.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        SkinInfo: Properties of the skin, with the error if it couldn't be read
+    """
+    info = SkinInfo(skin_folder)
+    try:
+        skin_ini = ini.load_skin_ini(skin_folder)
+        info.prefix = skin_ini.get_prefix()
+        info.colors = skin_ini.get_colors()
+
+        elements = {}
+        for basename in ["hitcircle", "hitcircleoverlay"] + [
+            f"{info.prefix}-{i}" for i in range(10)
+        ]:
+            path, hd = skin.find_skin_element(skin_folder, basename)
+            relative_path = os.path.relpath(path, skin_folder).replace(os.sep, "/")
+            elements[basename] = (relative_path, hd)
+
+        # Only files still as the last instafade left them are read from the
+        # originals, the same rule a new instafade follows
+        previous = fingerprint.read_fingerprint(skin_folder)
+        originals = {}
+        if previous:
+            inputs, current = fingerprint.resolve_inputs(
+                skin_folder,
+                [relative_path for relative_path, _ in elements.values()],
+                previous,
+            )
+            originals = {
+                relative_path: digest
+                for relative_path, digest in inputs.items()
+                if digest and digest != current[relative_path]
+            }
+        info.instafaded = bool(originals)
+
+        for basename, (relative_path, hd) in elements.items():
+            if relative_path in originals:
+                path = backup.object_path(skin_folder, originals[relative_path])
+            else:
+                path = os.path.join(skin_folder, relative_path)
+            info.elements[basename] = ElementInfo(
+                relative_path, hd, *read_png_size(path)
+            )
+
+        info.overlap = predict_overlap(
+            info.elements["hitcircle"],
+            info.elements["hitcircleoverlay"],
+            info.elements[f"{info.prefix}-9"],
+        )
+    except (OSError, ValueError) as e:
+        info.error = str(e)
+
+    return info
+
+
+def scan_library(
+    skins_dir: str,
+    jobs: int | None = None,
+    on_skin: Callable[[SkinInfo], None] | None = None,
+) -> list[SkinInfo]:
+    """Scan every skin in a Skins directory on a thread pool.
+
+    Args:
+        skins_dir: Path to an osu! Skins directory, or to a single skin folder
+        jobs: Number of threads, defaults to SCAN_WORKERS
+        on_skin: Optional callback invoked as each skin is scanned
+
+    Returns:
+        list[SkinInfo]: Skins in the order of their folders
+    """
+    skin_folders = batch.find_skins(skins_dir)
+    with ThreadPoolExecutor(max_workers=jobs or SCAN_WORKERS) as executor:
+        skins = []
+        for info in executor.map(scan_skin, skin_folders):
+            skins.append(info)
+            if on_skin:
+                on_skin(info)
+
+    return skins
+
+
+def write_index(path: str, skins_dir: str, skins: list[SkinInfo]) -> None:
+    """Write scanned skins as a JSON index.
+
+    Args:
+        path: Path of the index file
+        skins_dir: Directory that was scanned
+        skins: Scanned skins
+    """
+    backup.write_json(
+        os.path.abspath(path),
+        {
+            "skins_dir": os.path.abspath(skins_dir),
+            "scanned": time.time(),
+            "skins": [asdict(info) for info in skins],
+        },
+    )
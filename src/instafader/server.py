@@ -0,0 +1,455 @@
+import collections
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import encode, ini, memory, osk
+
+HOST = "127.0.0.1"
+PORT = 8000
+# Requests waiting for a worker beyond those being processed
+QUEUE_SIZE = 8
+# Seconds a request may take, from being accepted to its archive being ready
+TIMEOUT = 120
+# Largest archive accepted, in MiB
+MAX_UPLOAD = 256
+# Completed requests the latency percentiles are computed over
+LATENCY_WINDOW = 1000
+# Seconds the throughput is averaged over
+THROUGHPUT_WINDOW = 60
+
+
+class Rejected(Exception):
+    """Raised when a request can't be accepted, with the HTTP status to answer."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def process_osk(
+    osk_path: str,
+    color: tuple[int, int, int] | None,
+    output_path: str,
+    profile: str | None = None,
+    memory_budget: int | None = None,
+    trim: bool = False,
+    palette: float | None = None,
+) -> int | None:
+    """Instafade an uploaded archive in a worker process.
+
+    Args:
+        osk_path: Path to the uploaded .osk file
+        color: RGB color tuple, or None to use the skin's first combo color
+        output_path: Path of the new archive
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        memory_budget: Bytes of decoded images to hold at once, see encode.Encoder
+        trim: Whether to crop the transparent padding around the numbers
+        palette: Largest error of palette images, see encode.save_png()
+
+    Returns:
+        int | None: Peak RSS of the worker in bytes, if known
+    """
+    with encode.Encoder(
+        profile, memory_budget=memory_budget, palette=palette
+    ) as encoder:
+        osk.instafade_osk(osk_path, color, output_path, encoder=encoder, trim=trim)
+
+    return memory.peak_rss()
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of some values, None when there are none."""
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class InstafadeService:
+    """Instafades uploaded archives on a bounded process pool.
+
+    At most jobs archives are processed at once and queue_size more wait for
+    a worker. Further requests are rejected right away rather than piling up,
+    so a client can back off and retry. A request still unfinished after the
+    timeout is answered with an error: if it was waiting, it is dropped,
+    otherwise its worker finishes and the result is discarded. Its slot stays
+    taken until then, so a slow skin can't make the pool take on more work.
+
+    Args:
+        jobs: Number of worker processes, defaults to the CPU count
+        queue_size: Requests waiting for a worker beyond those being processed
+        timeout: Seconds a request may take
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        memory_budget: Bytes of decoded images each worker holds at once
+        trim: Whether to crop the transparent padding around the numbers
+        palette: Largest error of palette images, see encode.save_png()
+    """
+
+    def __init__(
+        self,
+        jobs: int | None = None,
+        queue_size: int = QUEUE_SIZE,
+        timeout: float = TIMEOUT,
+        profile: str | None = None,
+        memory_budget: int | None = None,
+        trim: bool = False,
+        palette: float | None = None,
+    ):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.capacity = self.jobs + queue_size
+        self.timeout = timeout
+        self.profile = profile
+        self.memory_budget = memory_budget
+        self.trim = trim
+        self.palette = palette
+        self.executor = self._new_executor()
+        self.broken = False
+        self.started = time.monotonic()
+
+        self.lock = threading.Lock()
+        self.pending: set[Future] = set()
+        # Slots taken by requests still uploading
+        self.reserved = 0
+        self.counts = collections.Counter()
+        self.latencies: collections.deque[float] = collections.deque(
+            maxlen=LATENCY_WINDOW
+        )
+        self.finished: collections.deque[float] = collections.deque()
+        self.peak_rss: int | None = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Forking a threaded server could copy a lock held by another thread
+        return ProcessPoolExecutor(
+            max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def reserve(self) -> None:
+        """Take a slot for a request before its upload is read.
+
+        The slot is handed over to the request by instafade(), or given back
+        with release() if the upload can't be read.
+
+        Raises:
+            Rejected: If every worker is busy and the queue is full
+        """
+        with self.lock:
+            taken = len(self.pending) + self.reserved
+            if taken >= self.capacity:
+                self.counts["rejected"] += 1
+                raise Rejected(
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                    f"Queue full ({taken} requests), retry later",
+                )
+            self.reserved += 1
+
+    def release(self) -> None:
+        """Give back a slot taken with reserve()."""
+        with self.lock:
+            self.reserved -= 1
+
+    def instafade(self, data: bytes, color: tuple[int, int, int] | None) -> bytes:
+        """Instafade an archive, waiting for a worker if needed.
+
+        The request must hold a slot from reserve(), which is released once the
+        archive is queued or fails to be.
+
+        Args:
+            data: Contents of the .osk file
+            color: RGB color tuple, or None to use the skin's first combo color
+
+        Returns:
+            bytes: Contents of the instafaded .osk file
+
+        Raises:
+            Rejected: If the request timed out
+            Exception: Whatever instafading the archive raised
+        """
+        start = time.monotonic()
+        try:
+            work_dir = tempfile.mkdtemp(prefix="instafader-server-")
+        except BaseException:
+            self.release()
+            raise
+        osk_path = os.path.join(work_dir, "skin.osk")
+        output_path = os.path.join(work_dir, "instafade.osk")
+        # Whoever is done last, the worker or the request, removes the files
+        abandoned = False
+        reserved = True
+
+        def finish(future: Future) -> None:
+            with self.lock:
+                self.pending.discard(future)
+                if not abandoned:
+                    return
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        try:
+            with open(osk_path, "wb") as f:
+                f.write(data)
+
+            with self.lock:
+                self.counts["accepted"] += 1
+                if self.broken:
+                    # A worker died, e.g. killed for running out of memory
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = self._new_executor()
+                    self.broken = False
+                future = self.executor.submit(
+                    process_osk,
+                    osk_path,
+                    color,
+                    output_path,
+                    self.profile,
+                    self.memory_budget,
+                    self.trim,
+                    self.palette,
+                )
+                self.pending.add(future)
+                self.reserved -= 1
+                reserved = False
+            future.add_done_callback(finish)
+
+            try:
+                peak_rss = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                with self.lock:
+                    self.counts["timed_out"] += 1
+                    abandoned = not future.done()
+                raise Rejected(
+                    HTTPStatus.GATEWAY_TIMEOUT, f"Timed out after {self.timeout:g}s"
+                ) from None
+            except Exception as e:
+                with self.lock:
+                    self.counts["failed"] += 1
+                    if isinstance(e, BrokenProcessPool):
+                        self.broken = True
+                raise
+
+            with open(output_path, "rb") as f:
+                output = f.read()
+        finally:
+            if reserved:
+                self.release()
+            if not abandoned:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        now = time.monotonic()
+        with self.lock:
+            self.counts["completed"] += 1
+            self.latencies.append(now - start)
+            self.finished.append(now)
+            if peak_rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, peak_rss)
+
+        return output
+
+    def metrics(self) -> dict:
+        """Queue depth, counters, latency percentiles and throughput."""
+        now = time.monotonic()
+        with self.lock:
+            while self.finished and self.finished[0] < now - THROUGHPUT_WINDOW:
+                self.finished.popleft()
+            running = sum(future.running() for future in self.pending)
+            latencies = list(self.latencies)
+
+            return {
+                "workers": self.jobs,
+                "capacity": self.capacity,
+                "in_flight": len(self.pending),
+                "uploading": self.reserved,
+                "running": running,
+                "queue_depth": len(self.pending) - running,
+                "accepted": self.counts["accepted"],
+                "completed": self.counts["completed"],
+                "failed": self.counts["failed"],
+                "rejected": self.counts["rejected"],
+                "timed_out": self.counts["timed_out"],
+                "latency": {
+                    "p50": percentile(latencies, 0.5),
+                    "p90": percentile(latencies, 0.9),
+                    "p99": percentile(latencies, 0.99),
+                    "samples": len(latencies),
+                },
+                # Completed requests per second over the last minute
+                "throughput": len(self.finished)
+                / min(THROUGHPUT_WINDOW, max(now - self.started, 1)),
+                "uptime": now - self.started,
+                "worker_peak_rss": self.peak_rss,
+            }
+
+    def close(self) -> None:
+        """Stop the workers, dropping the requests still waiting."""
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "InstafadeService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of an InstafadeService.
+
+    POST /instafade takes the .osk file as the request body, with an optional
+    color query parameter ("r,g,b"), and answers with the instafaded archive.
+    GET /metrics answers with InstafadeService.metrics() as JSON.
+    """
+
+    server: "InstafadeServer"
+    protocol_version = "HTTP/1.1"
+
+    def send_body(
+        self,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """Send a complete response."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_message(
+        self, status: HTTPStatus, message: str, headers: dict[str, str] | None = None
+    ) -> None:
+        """Send an error as a JSON object."""
+        self.send_body(
+            status,
+            json.dumps({"error": message}).encode(),
+            "application/json",
+            headers,
+        )
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != "/metrics":
+            self.send_error_message(HTTPStatus.NOT_FOUND, "Not found")
+            return
+
+        self.send_body(
+            HTTPStatus.OK,
+            json.dumps(self.server.service.metrics(), indent=2).encode(),
+            "application/json",
+        )
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/instafade":
+            self.close_connection = True
+            self.send_error_message(HTTPStatus.NOT_FOUND, "Not found")
+            return
+
+        color = None
+        query = parse_qs(url.query)
+        try:
+            if "color" in query:
+                color = ini.parse_color(query["color"][0])
+        except ValueError as e:
+            self.close_connection = True
+            self.send_error_message(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        service = self.server.service
+        try:
+            # Turn the upload away before reading it when there's no room,
+            # and hold the slot while it is read
+            service.reserve()
+            try:
+                data = self.read_body()
+            except BaseException:
+                service.release()
+                raise
+            output = service.instafade(data, color)
+        except Rejected as e:
+            # The body may be left unread
+            self.close_connection = True
+            headers = {}
+            if e.status == HTTPStatus.SERVICE_UNAVAILABLE:
+                headers["Retry-After"] = "1"
+            self.send_error_message(e.status, str(e), headers)
+            return
+        except (zipfile.BadZipFile, FileNotFoundError, ValueError) as e:
+            self.send_error_message(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+        except Exception as e:
+            self.log_error("instafade failed: %r", e)
+            self.send_error_message(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+
+        self.send_body(
+            HTTPStatus.OK,
+            output,
+            "application/octet-stream",
+            {"Content-Disposition": 'attachment; filename="instafade.osk"'},
+        )
+
+    def read_body(self) -> bytes:
+        """Read the uploaded archive.
+
+        Raises:
+            Rejected: If the length is missing or above the server's limit, or
+                the client disconnected before sending all of it
+        """
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            raise Rejected(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+        if int(length) > self.server.max_upload:
+            raise Rejected(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"Archive larger than {self.server.max_upload // memory.MIB} MiB",
+            )
+
+        data = self.rfile.read(int(length))
+        if len(data) < int(length):
+            raise Rejected(HTTPStatus.BAD_REQUEST, "Upload incomplete")
+
+        return data
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class InstafadeServer(ThreadingHTTPServer):
+    """HTTP server handing requests to an InstafadeService.
+
+    Args:
+        address: Host and port to listen on
+        service: Service processing the archives
+        max_upload: Largest archive accepted, in bytes
+        quiet: Whether to skip logging each request
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        service: InstafadeService,
+        max_upload: int = MAX_UPLOAD * memory.MIB,
+        quiet: bool = False,
+    ):
+        super().__init__(address, RequestHandler)
+        self.service = service
+        self.max_upload = max_upload
+        self.quiet = quiet
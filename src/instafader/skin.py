@@ -0,0 +1,128 @@
+import functools
+import os
+
+from PIL import Image
+
+from . import render, trace
+
+
+def find_skin_element(skin_folder: str, basename: str) -> tuple[str, bool]:
+    """Find the file of a skin element, preferring the HD version.
+
+    Args:
+        skin_folder: Path to the skin folder
+        basename: Base name of the file without HD suffix (e.g. "hitcircle" or "skin/numbers/default-1")
+
+    Returns:
+        tuple: (path to the element, bool indicating if HD version)
+
+    Raises:
+        FileNotFoundError: If neither HD nor SD version exists
+    """
+    hd_path = os.path.join(skin_folder, f"{basename}@2x.png")
+    if os.path.isfile(hd_path):
+        return hd_path, True
+
+    sd_path = os.path.join(skin_folder, f"{basename}.png")
+    if os.path.isfile(sd_path):
+        return sd_path, False
+
+    raise FileNotFoundError(f"Could not find {basename} in HD or SD version")
+
+
+@functools.lru_cache(maxsize=32)
+@trace.traced("decode")
+def _decode_element(
+    path: str, mtime_ns: int, size: int, scale: float | None
+) -> Image.Image:
+    if scale is not None:
+        image = _decode_element(path, mtime_ns, size, None)
+        return render.resize_element(image, scale)
+
+    with Image.open(path) as image:
+        return image.convert("RGBA")
+
+
+def decode_element(path: str, scale: float | None = None) -> Image.Image:
+    """Decode a skin element through an LRU cache keyed by path, mtime and size.
+
+    The returned image is shared between callers and must not be modified.
+
+    Args:
+        path: Path to the element
+        scale: Optional scale factor to resize the decoded element by
+
+    Returns:
+        Image.Image: Decoded RGBA image
+    """
+    stat = os.stat(path)
+    return _decode_element(path, stat.st_mtime_ns, stat.st_size, scale)
+
+
+@functools.lru_cache(maxsize=32)
+@trace.traced("decode_preview")
+def _decode_preview_element(
+    path: str, mtime_ns: int, size: int, scale: float
+) -> Image.Image:
+    with Image.open(path) as image:
+        target = (
+            max(1, round(image.width * scale)),
+            max(1, round(image.height * scale)),
+        )
+        # Only JPEG decoders can shrink while decoding, PNGs are decoded whole
+        image.draft("RGBA", target)
+        image = image.convert("RGBA")
+
+    # Average whole blocks of pixels first, which is cheap, then make up the
+    # remaining fraction with a bilinear resize of the already small image
+    factor = min(image.width // target[0], image.height // target[1])
+    if factor > 1:
+        image = image.reduce(factor)
+    if image.size != target:
+        image = image.resize(target, resample=Image.Resampling.BILINEAR)
+
+    return image
+
+
+def decode_preview_element(path: str, scale: float) -> Image.Image:
+    """Decode a skin element shrunk for a preview, through an LRU cache.
+
+    Only the reduced image is cached, so previewing a skin with huge textures
+    costs the same as a small one once decoded.
+
+    Args:
+        path: Path to the element
+        scale: Scale factor to shrink the decoded element by
+
+    Returns:
+        Image.Image: Decoded RGBA image, shared and not to be modified
+    """
+    stat = os.stat(path)
+    return _decode_preview_element(path, stat.st_mtime_ns, stat.st_size, scale)
+
+
+@trace.traced("decode")
+def load_skin_element(
+    skin_folder: str,
+    basename: str,
+    source: str | None = None,
+) -> tuple[Image.Image, bool]:
+    """Find and decode a skin element.
+
+    Args:
+        skin_folder: Path to the skin folder
+        basename: Base name of the file without HD suffix (e.g. "hitcircle" or "skin/numbers/default-1")
+        source: Path to decode instead of the skin's file, e.g. a backed up original
+
+    Returns:
+        tuple: (PIL Image object, bool indicating if HD version)
+
+    Raises:
+        FileNotFoundError: If neither HD nor SD version exists
+    """
+    path, is_hd = find_skin_element(skin_folder, basename)
+
+    with Image.open(source or path) as image:
+        image = image.convert("RGBA")
+
+    return image, is_hd
@@ -0,0 +1,192 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from functools import wraps
+
+# Set to a file path to record spans and write them there as a Chrome trace
+# (chrome://tracing or https://ui.perfetto.dev) when the process exits
+TRACE_ENV = "INSTAFADER_TRACE"
+
+_events: list[dict] = []
+_lock = threading.Lock()
+_path: str | None = None
+
+
+class _NullSpan:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "cat": "instafader",
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        with _lock:
+            _events.append(event)
+
+
+def enabled() -> bool:
+    """Whether spans are being recorded."""
+    return _path is not None
+
+
+def span(name: str, **args) -> _Span | _NullSpan:
+    """Context manager recording the time spent in a block as a span.
+
+    When tracing is disabled a shared no-op context manager is returned, so
+    instrumented code costs a function call and a comparison.
+
+    Args:
+        name: Name of the span
+        args: Optional details shown with the span in the trace viewer
+
+    Returns:
+        Context manager timing the block
+    """
+    if _path is None:
+        return _NULL_SPAN
+
+    return _Span(name, args)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator recording every call of a function as a span.
+
+    Args:
+        name: Name of the span
+
+    Returns:
+        Callable: Decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _path is None:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def collect() -> list[dict]:
+    """Remove and return the spans recorded so far, e.g. to hand them to the parent."""
+    global _events
+    with _lock:
+        events, _events = _events, []
+
+    return events
+
+
+def add_events(events: list[dict]) -> None:
+    """Add spans recorded by another process."""
+    with _lock:
+        _events.extend(events)
+
+
+def summary(events: list[dict]) -> str:
+    """Format a table of the total, mean and longest time of each span name.
+
+    Args:
+        events: Recorded spans
+
+    Returns:
+        str: Table sorted by total time, longest first
+    """
+    totals: dict[str, list[float]] = {}
+    for event in events:
+        totals.setdefault(event["name"], []).append(event["dur"] / 1000)
+
+    lines = [f"{'span':<28}{'calls':>7}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+    for name, durations in sorted(
+        totals.items(), key=lambda item: sum(item[1]), reverse=True
+    ):
+        lines.append(
+            f"{name:<28}{len(durations):>7}{sum(durations):>12.2f}"
+            f"{sum(durations) / len(durations):>10.2f}{max(durations):>10.2f}"
+        )
+
+    return "\n".join(lines)
+
+
+def write(path: str) -> list[dict]:
+    """Write the recorded spans as a Chrome trace JSON file.
+
+    Args:
+        path: Path of the trace file
+
+    Returns:
+        list[dict]: Spans written
+    """
+    with _lock:
+        events = list(_events)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    return events
+
+
+def _write_at_exit() -> None:
+    import multiprocessing
+
+    # Worker processes hand their spans to the parent, which writes the file
+    if _path is None or not _events or multiprocessing.parent_process():
+        return
+
+    events = write(_path)
+    print(f"Trace written to {_path}", file=sys.stderr)
+    print(summary(events), file=sys.stderr)
+
+
+def enable(path: str) -> None:
+    """Start recording spans and write them to a file when the process exits.
+
+    Worker processes started afterwards inherit the setting through the
+    environment.
+
+    Args:
+        path: Path of the trace file
+    """
+    global _path
+    if _path is None:
+        atexit.register(_write_at_exit)
+
+    _path = os.path.abspath(path)
+    os.environ[TRACE_ENV] = _path
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
@@ -0,0 +1,263 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+if os.name == "posix":
+    import fcntl
+else:
+    import msvcrt
+
+from . import backup, trace
+
+STAGING_FOLDER = "staging"
+JOURNAL_FOLDER = "transactions"
+LOCK_FILE = "lock"
+
+
+class SkinChanged(Exception):
+    """Raised when a skin file changed after the transaction was planned."""
+
+
+def fsync_file(path: str) -> None:
+    """Flush a file's contents to disk."""
+    # Windows only flushes through a handle open for writing
+    with open(path, "r+b") as f:
+        os.fsync(f.fileno())
+
+
+def fsync_folder(path: str) -> None:
+    """Flush a folder's entries to disk, so renames into it survive a crash."""
+    # Folders can't be opened on Windows, where NTFS journals renames anyway
+    if os.name != "posix":
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SkinLock:
+    """Exclusive lock on a skin, held from recovery until a run has committed.
+
+    recover() drops everything staged, so two runs on the same skin, e.g. a
+    watch and the window, must not overlap. The lock is taken on a file in the
+    store, and released by the system if the process dies.
+    """
+
+    def __init__(self, skin_folder: str) -> None:
+        self.path = backup.store_path(skin_folder, LOCK_FILE)
+        self.file = None
+
+    def __enter__(self) -> "SkinLock":
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a+b")
+        try:
+            if os.name == "posix":
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                # LK_LOCK gives up after 10 attempts, keep waiting
+                self.file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except BaseException:
+            self.file.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if os.name == "posix":
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+
+
+class Transaction:
+    """Changes to a skin staged in its store and applied all at once.
+
+    Files are written to a staging folder inside the store, on the same drive
+    as the skin, so they can be moved in place with os.replace(). commit()
+    flushes them to disk in one pass, then writes a journal of the moves and
+    removals. Once the journal exists, the transaction counts as done: if
+    applying it is interrupted, recover() finishes the job on the next run.
+    Until then the skin is untouched, and an error discards the staged files.
+
+    Args:
+        skin_folder: Path to the skin folder
+    """
+
+    def __init__(self, skin_folder: str):
+        self.skin_folder = skin_folder
+        self.name = datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f")
+        self.directory = backup.store_path(skin_folder, STAGING_FOLDER, self.name)
+        self.removals: list[str] = []
+        self.committed = False
+        os.makedirs(self.directory)
+
+    def path(self, relative_path: str) -> str:
+        """Staged path of a skin file, creating its folder.
+
+        Args:
+            relative_path: Path of the file relative to the skin folder
+
+        Returns:
+            str: Path to write the new contents of the file to
+        """
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def remove(self, relative_path: str) -> None:
+        """Remove a skin file when the transaction is applied, if it exists."""
+        self.removals.append(relative_path)
+
+    def staged_files(self) -> list[str]:
+        """Paths of the staged files relative to the skin folder.
+
+        Files inside the store come last, so the store is only updated once
+        the skin's own files are.
+        """
+        relative_paths = []
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                relative_paths.append(
+                    os.path.relpath(
+                        os.path.join(root, file_name), self.directory
+                    ).replace(os.sep, "/")
+                )
+
+        return sorted(
+            relative_paths,
+            key=lambda path: (path.startswith(f"{backup.STORE_FOLDER}/"), path),
+        )
+
+    @trace.traced("commit")
+    def commit(self, expected: dict[str, str | None] | None = None) -> None:
+        """Flush the staged files, record the transaction and apply it.
+
+        Args:
+            expected: Content hash each skin file must still have, None for
+                files that must not exist. Checked first, so a file saved while
+                the outputs were rendered isn't overwritten
+
+        Raises:
+            SkinChanged: If a file no longer has its expected contents
+        """
+        for relative_path, digest in (expected or {}).items():
+            try:
+                current = backup.hash_file(
+                    os.path.join(self.skin_folder, relative_path)
+                )
+            except FileNotFoundError:
+                current = None
+            if current != digest:
+                raise SkinChanged(f"{relative_path} changed while instafading")
+
+        replaced = self.staged_files()
+        with trace.span("fsync", files=len(replaced)):
+            for relative_path in replaced:
+                fsync_file(os.path.join(self.directory, relative_path))
+
+        journal_path = backup.store_path(
+            self.skin_folder, JOURNAL_FOLDER, f"{self.name}.json"
+        )
+        backup.write_json(
+            journal_path,
+            {"staging": self.name, "replace": replaced, "remove": self.removals},
+        )
+        fsync_file(journal_path)
+        fsync_folder(os.path.dirname(journal_path))
+        self.committed = True
+
+        apply(self.skin_folder, journal_path)
+
+    def abort(self) -> None:
+        """Discard the staged files, leaving the skin untouched.
+
+        A committed transaction is kept for recover() to finish instead.
+        """
+        if not self.committed:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is not None:
+            self.abort()
+
+
+@trace.traced("apply")
+def apply(skin_folder: str, journal_path: str) -> None:
+    """Apply a committed transaction, skipping the moves already done.
+
+    Args:
+        skin_folder: Path to the skin folder
+        journal_path: Path to the transaction's journal
+    """
+    with open(journal_path, encoding="utf-8") as f:
+        journal = json.load(f)
+    staging = backup.store_path(skin_folder, STAGING_FOLDER, journal["staging"])
+
+    folders = set()
+    for relative_path in journal["replace"]:
+        staged = os.path.join(staging, relative_path)
+        target = os.path.join(skin_folder, relative_path)
+        # A file missing from staging was moved before an interruption
+        if os.path.exists(staged):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(staged, target)
+        folders.add(os.path.dirname(target))
+
+    for relative_path in journal["remove"]:
+        target = os.path.join(skin_folder, relative_path)
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+        folders.add(os.path.dirname(target))
+
+    for folder in folders:
+        fsync_folder(folder)
+
+    os.remove(journal_path)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def recover(skin_folder: str) -> int:
+    """Finish transactions interrupted while applying, drop uncommitted ones.
+
+    Callers hold a SkinLock, otherwise the staging folder of another run
+    still in progress would be dropped too.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        int: Number of transactions finished
+    """
+    journal_folder = backup.store_path(skin_folder, JOURNAL_FOLDER)
+    try:
+        journals = sorted(
+            file_name
+            for file_name in os.listdir(journal_folder)
+            if file_name.endswith(".json")
+        )
+    except FileNotFoundError:
+        journals = []
+
+    for file_name in journals:
+        apply(skin_folder, os.path.join(journal_folder, file_name))
+
+    # Whatever is still staged belongs to runs that never committed
+    shutil.rmtree(backup.store_path(skin_folder, STAGING_FOLDER), ignore_errors=True)
+
+    return len(journals)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from . import cache, encode, fingerprint, ini, pipeline
+
+POLL_INTERVAL = 0.5
+# Editors often write a file several times per save, wait for them to settle
+DEBOUNCE = 1.0
+
+
+@dataclass
+class WatchRun:
+    """Outcome of one regeneration triggered by changed files."""
+
+    changed: list[str]
+    seconds: float
+    written: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+def watched_files(skin_folder: str) -> list[str]:
+    """List the files an instafade of the skin reads, whether they exist or not.
+
+    Both the HD and SD name of every element are included, since adding or
+    removing either changes which one is used.
+
+    Args:
+        skin_folder: Path to the skin folder
+
+    Returns:
+        list[str]: Paths relative to the skin folder
+    """
+    try:
+        prefix = ini.load_skin_ini(skin_folder).get_prefix()
+    except FileNotFoundError:
+        prefix = "default"
+
+    basenames = ["hitcircle", "hitcircleoverlay"] + [f"{prefix}-{i}" for i in range(10)]
+    return ["skin.ini"] + [
+        f"{basename}{suffix}.png" for basename in basenames for suffix in ("@2x", "")
+    ]
+
+
+def file_states(
+    skin_folder: str, relative_paths: list[str]
+) -> dict[str, tuple[int, int] | None]:
+    """Stat files cheaply enough to poll.
+
+    Args:
+        skin_folder: Path to the skin folder
+        relative_paths: Paths relative to the skin folder
+
+    Returns:
+        dict: (mtime in ns, size) of each file, None for missing files
+    """
+    states = {}
+    for relative_path in relative_paths:
+        try:
+            stat = os.stat(os.path.join(skin_folder, relative_path))
+        except FileNotFoundError:
+            states[relative_path] = None
+        else:
+            states[relative_path] = (stat.st_mtime_ns, stat.st_size)
+
+    return states
+
+
+def watch(
+    skin_folder: str,
+    color: tuple[int, int, int],
+    on_run: Callable[[WatchRun], None] | None = None,
+    stop: threading.Event | None = None,
+    interval: float = POLL_INTERVAL,
+    debounce: float = DEBOUNCE,
+    profile: str | None = None,
+    memory_budget: int | None = None,
+    render_cache: cache.RenderCache | None = None,
+    trim: bool = False,
+    palette: float | None = None,
+) -> None:
+    """Instafade a skin, then again whenever its source elements change.
+
+    Files are polled, and a burst of changes triggers a single run once no
+    file has changed for the debounce time. Each run goes through the
+    fingerprint of instafade_skin(), so only the numbers depending on a
+    changed file are rendered again, and skin.ini is only rewritten when the
+    overlap or color actually changes.
+
+    Args:
+        skin_folder: Path to the skin folder
+        color: RGB color tuple to tint the hitcircle with
+        on_run: Optional callback receiving the outcome of every run
+        stop: Event ending the watch when set, runs until interrupted otherwise
+        interval: Seconds between polls
+        debounce: Seconds without changes to wait before running
+        profile: PNG encoder profile, defaults to encode.PROFILE
+        memory_budget: Bytes of decoded images to hold at once, see encode.Encoder
+        render_cache: Cache of renders shared with other skins, if any
+        trim: Whether to crop the transparent padding around the numbers
+        palette: Largest error of palette images, see encode.save_png()
+    """
+    stop = stop or threading.Event()
+
+    def run(changed: list[str]) -> dict[str, tuple[int, int] | None]:
+        start = time.perf_counter()
+        result = WatchRun(changed, 0)
+        before = file_states(skin_folder, watched_files(skin_folder))
+        try:
+            with encode.Encoder(
+                profile, memory_budget=memory_budget, palette=palette
+            ) as encoder:
+                pipeline.instafade_skin(
+                    skin_folder,
+                    color,
+                    encoder=encoder,
+                    render_cache=render_cache,
+                    trim=trim,
+                )
+            result.written = [
+                os.path.relpath(file.path, skin_folder) for file in encoder.results
+            ]
+        except Exception as e:
+            # A half-saved image fails to decode, its change is picked up again
+            result.error = str(e)
+
+        result.seconds = time.perf_counter() - start
+        if on_run:
+            on_run(result)
+
+        # The run's own writes don't trigger another, but a file saved while it
+        # ran keeps its earlier state so the change is still picked up
+        after = file_states(skin_folder, watched_files(skin_folder))
+        outputs = (fingerprint.read_fingerprint(skin_folder) or {}).get("outputs", {})
+        for relative_path, state in after.items():
+            if state == before.get(relative_path, state):
+                continue
+            written = outputs.get(relative_path)
+            if written is None or written != fingerprint.file_digest(
+                os.path.join(skin_folder, relative_path)
+            ):
+                after[relative_path] = before.get(relative_path)
+
+        return after
+
+    states = run([])
+    changed: set[str] = set()
+    last_change = 0.0
+    while not stop.wait(interval):
+        current = file_states(skin_folder, list(states))
+        if current != states:
+            changed.update(path for path in current if current[path] != states[path])
+            states = current
+            last_change = time.monotonic()
+
+        if changed and time.monotonic() - last_change >= debounce:
+            states = run(sorted(changed))
+            changed = set()
@@ -0,0 +1,86 @@
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from . import trace
+
+
+class Cancelled(Exception):
+    """Raised inside a task's progress callback once the task has been cancelled."""
+
+
+class Task:
+    """Run a pipeline function on a background thread.
+
+    The function is called with a ``progress`` keyword argument. Every call to
+    it puts a progress event on a queue and doubles as a cancellation point.
+    The owner drains the queue with ``poll()`` at whatever rate it likes, so
+    the number of pipeline steps does not affect how often the UI redraws.
+    """
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.events: queue.Queue[tuple[str, Any]] = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "Task":
+        """Start the task and return it."""
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Ask the task to stop at its next progress report."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._cancel.is_set()
+
+    def progress(self, value: float) -> None:
+        """Report progress from the worker thread.
+
+        Args:
+            value: Completed fraction (0.0-1.0)
+
+        Raises:
+            Cancelled: If the task has been cancelled
+        """
+        if self._cancel.is_set():
+            raise Cancelled()
+        self.events.put(("progress", value))
+
+    def poll(self) -> tuple[float | None, tuple[str, Any] | None]:
+        """Drain all pending events without blocking.
+
+        Returns:
+            tuple: (latest progress value or None, final event or None). The
+            final event is ("done", result), ("cancelled", None) or
+            ("error", exception).
+        """
+        latest = None
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                return latest, None
+
+            if kind == "progress":
+                latest = value
+            else:
+                return latest, (kind, value)
+
+    def _run(self) -> None:
+        try:
+            with trace.span(self.func.__name__):
+                result = self.func(*self.args, progress=self.progress, **self.kwargs)
+        except Cancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", e))
+        else:
+            self.events.put(("done", result))
@@ -1,18 +1,18 @@
 import os
-import re
-import shutil
-from datetime import datetime
+from collections.abc import Callable
 from tkinter import colorchooser, messagebox
 
 import customtkinter
 from customtkinter import filedialog
-from PIL import Image, ImageChops
+from PIL import Image
 
-# Constants
-DEFAULT_COLORS = [(255, 192, 0), (0, 202, 0), (18, 124, 255), (242, 24, 57)]
+from instafader import backup, cache, ini, pipeline, preview, worker
 
-customtkinter.set_appearance_mode("system")
-customtkinter.set_default_color_theme("blue")
+# Constants
+ALL_COLORS = "All Colors"
+CUSTOM_COLOR = "Custom Color"
+PROGRESS_INTERVAL_MS = 33  # Redraw progress at ~30 fps however many steps a task has
+PREVIEW_DEBOUNCE_MS = 150  # Only render the last of several quick color changes
 
 
 class Instafader(customtkinter.CTk):
@@ -25,10 +25,17 @@ class Instafader(customtkinter.CTk):
 
         # Variables
         self.skin_folder: str | None = None
-        self.colors: list[tuple[int, int, int]] = DEFAULT_COLORS
+        self.colors: list[tuple[int, int, int]] = list(ini.DEFAULT_COLORS)
         self.hitcircle_prefix: str | None = "default"
         self.selected_color: tuple[int, int, int] | None = None
-        self.backup_dir: str | None = None
+        self.all_colors = False
+        self.task: worker.Task | None = None
+        self.on_task_done: Callable[[str, object], None] | None = None
+        self.preview_generation = 0
+        self.preview_after: str | None = None
+        self.preview_task: worker.Task | None = None
+        # One cache for the session, so it trims after enough renders were added
+        self.render_cache = cache.default_cache()
 
         # Grid
         self.grid_columnconfigure(0, weight=1)
@@ -48,13 +55,20 @@ class Instafader(customtkinter.CTk):
         self.folder_select_button.grid(row=0, column=1, padx=(2.5, 5), sticky="e")
 
         # Image preview
-        placeholder = Image.new("RGBA", (195, 195), (0, 0, 0, 0))
-        placeholder_image = customtkinter.CTkImage(
-            light_image=placeholder, dark_image=placeholder, size=(195, 195)
+        placeholder = Image.new(
+            "RGBA", (preview.PREVIEW_SIZE, preview.PREVIEW_SIZE), (0, 0, 0, 0)
+        )
+        self.placeholder_image = customtkinter.CTkImage(
+            light_image=placeholder,
+            dark_image=placeholder,
+            size=(preview.PREVIEW_SIZE, preview.PREVIEW_SIZE),
         )
 
         self.image_preview = customtkinter.CTkLabel(
-            self, image=placeholder_image, text=""
+            self,
+            image=self.placeholder_image,
+            text="",
+            wraplength=preview.PREVIEW_SIZE,
         )
         self.image_preview.grid(
             row=1, column=0, columnspan=2, padx=5, pady=(20, 10), sticky="n"
@@ -63,7 +77,7 @@ class Instafader(customtkinter.CTk):
         # Color combobox
         self.color_combobox = customtkinter.CTkComboBox(
             self,
-            values=[f"{r}, {g}, {b}" for r, g, b in self.colors] + ["Custom Color"],
+            values=self.color_options(self.colors),
             command=self.on_color_selected,
             width=200,
             state="readonly",
@@ -131,88 +145,120 @@ class Instafader(customtkinter.CTk):
         if self.colors:
             self.generate_preview(self.colors[0])
 
-    # TODO: extract logic from instafade() and use that when generating previews
     def generate_preview(self, color: tuple[int, int, int]) -> None:
         """Generate preview image using the specified color.
 
         Args:
             color: RGB color tuple to use for preview
         """
-        try:
-            # Create temporary backup dir for preview
-            preview_backup = os.path.join(self.skin_folder, "preview-temp")
-            os.makedirs(preview_backup, exist_ok=True)
+        self.schedule_preview(
+            preview.render_preview,
+            self.skin_folder,
+            self.hitcircle_prefix,
+            color,
+            preview.PREVIEW_SIZE,
+        )
 
-            # Load required elements
-            hitcircle, hitcircle_hd = self.load_skin_element(
-                "hitcircle", preview_backup
-            )
-            hitcircleoverlay, hitcircleoverlay_hd = self.load_skin_element(
-                "hitcircleoverlay", preview_backup
-            )
-            number, number_hd = self.load_skin_element(
-                f"{self.hitcircle_prefix}-1", preview_backup
-            )
+    def generate_preview_grid(self) -> None:
+        """Generate a grid of previews, one for each combo color."""
+        self.schedule_preview(
+            preview.render_preview_grid,
+            self.skin_folder,
+            self.hitcircle_prefix,
+            list(self.colors),
+            preview.PREVIEW_SIZE,
+        )
 
-            # Create colored hitcircle
-            solid_color = Image.new(
-                mode="RGBA",
-                size=(hitcircle.width, hitcircle.height),
-                color=color,
-            )
-            hitcircle = ImageChops.multiply(
-                hitcircle.convert("RGBA"), solid_color.convert("RGBA")
-            )
+    def schedule_preview(self, func: Callable[..., Image.Image], *args) -> None:
+        """Render a preview on a background worker once the selection settles.
 
-            # Resize elements if needed
-            hitcircle = self.resize_element(
-                hitcircle,
-                self.calculate_resize_factor(hitcircle_hd, hitcircleoverlay_hd),
-            )
-            hitcircleoverlay = self.resize_element(
-                hitcircleoverlay,
-                self.calculate_resize_factor(hitcircleoverlay_hd, hitcircle_hd),
-            )
+        Every request takes a new generation, so a quick series of requests
+        only renders the last one, and a render finishing after a newer
+        request is dropped instead of shown.
 
-            # Create composite
-            circle = self.create_composite_image(hitcircle, hitcircleoverlay)
+        Args:
+            func: Preview function, called with args
+            args: Arguments for the preview function
+        """
+        self.preview_generation += 1
+        if self.preview_after:
+            self.after_cancel(self.preview_after)
+        self.preview_after = self.after(
+            PREVIEW_DEBOUNCE_MS,
+            self.start_preview,
+            self.preview_generation,
+            func,
+            args,
+        )
 
-            # Add number
-            if number.size > circle.size:
-                result = Image.new("RGBA", number.size, (255, 255, 255, 0))
-                paste_position = (
-                    (number.width - circle.width) // 2,
-                    (number.height - circle.height) // 2,
-                )
-                result.paste(circle, paste_position, circle)
-                result.paste(number, (0, 0), number)
-            else:
-                result = circle
-                w, h = number.size
-                if not number_hd and (hitcircle_hd or hitcircleoverlay_hd):
-                    number = number.resize(
-                        (w * 2, h * 2), resample=Image.Resampling.LANCZOS
-                    )
-                    w, h = number.size
-                x, y = result.size
-                result.paste(number, ((x - w) // 2, (y - h) // 2), number)
-
-            # Convert to PhotoImage and display
-            preview_image = customtkinter.CTkImage(
-                light_image=result, dark_image=result, size=(195, 195)
+    def start_preview(
+        self, generation: int, func: Callable[..., Image.Image], args: tuple
+    ) -> None:
+        """Start rendering a scheduled preview, stopping any older render.
+
+        Args:
+            generation: Generation of the request
+            func: Preview function
+            args: Arguments for the preview function
+        """
+        self.preview_after = None
+        if self.preview_task:
+            self.preview_task.cancel()
+
+        self.preview_task = worker.Task(func, *args).start()
+        self.after(
+            PROGRESS_INTERVAL_MS, self.poll_preview, self.preview_task, generation
+        )
+
+    def poll_preview(self, task: worker.Task, generation: int) -> None:
+        """Show a preview once rendered, unless a newer one was requested.
+
+        Args:
+            task: Task rendering the preview
+            generation: Generation of the request the task renders
+        """
+        _, final = task.poll()
+        if final is None:
+            self.after(PROGRESS_INTERVAL_MS, self.poll_preview, task, generation)
+            return
+
+        if task is self.preview_task:
+            self.preview_task = None
+        if generation != self.preview_generation:
+            return
+
+        kind, value = final
+        if kind == "done":
+            self.show_preview(value)
+        elif kind == "error":
+            # Shown in place of the preview, a dialog would interrupt browsing
+            self.image_preview.configure(
+                image=self.placeholder_image, text=f"No preview:\n{value}"
             )
-            self.image_preview.configure(image=preview_image)
-            self.image_preview.image = preview_image  # Keep a reference
 
-            # Cleanup
-            shutil.rmtree(preview_backup, ignore_errors=True)
+    def show_preview(self, image: Image.Image) -> None:
+        """Display an image in the preview.
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate preview: {e}")
+        Args:
+            image: Image to display
+        """
+        # Convert to PhotoImage and display
+        preview_image = customtkinter.CTkImage(
+            light_image=image,
+            dark_image=image,
+            size=(preview.PREVIEW_SIZE, preview.PREVIEW_SIZE),
+        )
+        self.image_preview.configure(image=preview_image, text="")
+        self.image_preview.image = preview_image  # Keep a reference
 
     def on_color_selected(self, choice: str) -> None:
         """Handle color selection from combobox"""
-        if choice == "Custom Color":
+        self.all_colors = choice == ALL_COLORS
+
+        if choice == ALL_COLORS:
+            self.selected_color = None
+            self.generate_preview_grid()
+        elif choice == CUSTOM_COLOR:
             if color := colorchooser.askcolor(parent=self)[0]:
                 self.selected_color = tuple(map(int, color))
                 self.colors.append(self.selected_color)
@@ -233,521 +279,191 @@ class Instafader(customtkinter.CTk):
             messagebox.showerror("Error", "No skin folder selected")
             return
 
-        skin_ini = os.path.join(self.skin_folder, "skin.ini")
-        if not os.path.exists(skin_ini):
-            messagebox.showerror("Error", "skin.ini not found")
+        try:
+            skin_ini = ini.load_skin_ini(self.skin_folder)
+        except FileNotFoundError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        with open(skin_ini, "rb") as f:
-            data = f.read().splitlines()
-
-            self.colors = self.get_colors(data)
-            self.hitcircle_prefix = self.get_prefix(data)
+        self.colors = skin_ini.get_colors()
+        self.hitcircle_prefix = skin_ini.get_prefix()
 
-            self.update_color_options(self.colors)
+        self.update_color_options(self.colors)
 
-    def get_colors(self, data: list[bytes]) -> list[tuple[int, int, int]]:
-        """Extract combo colors from skin.ini data.
+    def update_color_options(self, colors: list[tuple[int, int, int]]) -> None:
+        """Update color options in the combo
 
         Args:
-            data: List of bytes containing skin.ini file contents
-
-        Returns:
-            List of RGB color tuples, or DEFAULT_COLORS if none found
+            colors: List of RGB color tuples
         """
-        colors = []
-
-        for line in data:
-            if b"Combo" not in line:
-                continue
-
-            if b"//" in line and line.find(b"//") < line.find(b"Combo"):
-                continue
+        self.color_combobox.configure(values=self.color_options(colors))
 
-            decoded = line.decode("utf-8")
-            combo_part = decoded[decoded.find("Combo") + 5 :]
-
-            if not combo_part[0].isdigit():
-                continue
-
-            index = 1
-            while index < len(combo_part) and not combo_part[index].isdigit():
-                index += 1
-
-            color_string = combo_part[index:].strip()
-            color_values = color_string.split(",")
-            rgb_tuple = tuple(int(value.strip()[:3]) for value in color_values)
-            colors.append(rgb_tuple)
-
-        return DEFAULT_COLORS if not colors else colors
-
-    def set_color(self, color: tuple[int, int, int]) -> None:
-        """Set single combo color in skin.ini file and remove other combo colors.
+    def color_options(self, colors: list[tuple[int, int, int]]) -> list[str]:
+        """Build the combobox entries for a list of colors
 
         Args:
-            color: RGB color tuple to set as Combo1
-        """
-        try:
-            skin_ini_path = os.path.join(self.skin_folder, "skin.ini")
-
-            with open(skin_ini_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            colours_section_found = False
-            color_added = False
-            new_lines = []
-
-            for line in lines:
-                if (
-                    not re.match(r"Combo\d+:", line.strip())
-                    or "//" in line[: line.find("Combo")]
-                ):
-                    if "[Colours]" in line:
-                        colours_section_found = True
-                        new_lines.append(line)
-                        new_lines.append(
-                            f"Combo1: {color[0]}, {color[1]}, {color[2]}\n"
-                        )
-                        color_added = True
-                    else:
-                        new_lines.append(line)
-
-            if not colours_section_found:
-                if new_lines and not new_lines[-1].endswith("\n"):
-                    new_lines.append("\n")
-                new_lines.append("[Colours]\n")
-                new_lines.append(f"Combo1: {color[0]}, {color[1]}, {color[2]}\n")
-            elif not color_added:
-                new_lines.append(f"Combo1: {color[0]}, {color[1]}, {color[2]}\n")
-
-            with open(skin_ini_path, "w", encoding="utf-8") as f:
-                f.writelines(new_lines)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to set combo color: {e}")
-
-    def get_prefix(self, data: list[bytes]) -> str:
-        """Extract hitcircle prefix from skin.ini data.
-
-        Args:
-            data: List of bytes containing skin.ini file contents
+            colors: List of RGB color tuples
 
         Returns:
-            str: Hitcircle prefix, or "default" if not found
+            list[str]: One entry per color, followed by the special entries
         """
-        for line in data:
-            if b"HitCirclePrefix" in line:
-                decoded_line = line.decode("utf-8").strip()
-                prefix = decoded_line.split(":", 1)[1].strip()
-                return prefix.replace("\\", "/")
+        return [f"{r}, {g}, {b}" for r, g, b in colors] + [ALL_COLORS, CUSTOM_COLOR]
 
-        return "default"
+    def instafade(self) -> None:
+        """Instafade the skin on a background worker"""
+        if not self.skin_folder:
+            messagebox.showerror("Error", "No skin folder selected")
+            return
 
-    def set_overlap(self, overlap: str) -> None:
-        """Set hitcircle overlap in skin.ini file.
+        if self.all_colors:
+            self.start_task(
+                worker.Task(
+                    pipeline.render_variants,
+                    self.skin_folder,
+                    list(self.colors),
+                    os.path.join(self.skin_folder, pipeline.VARIANTS_FOLDER),
+                    self.hitcircle_prefix,
+                ),
+                self.on_variants_done,
+            )
+            return
 
-        Args:
-            overlap: New overlap to set
-        """
-        try:
-            skin_ini_path = os.path.join(self.skin_folder, "skin.ini")
-
-            with open(skin_ini_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            overlap_found = False
-            for i, line in enumerate(lines):
-                if "HitCircleOverlap" in line and "//" not in line:
-                    lines[i] = f"HitCircleOverlap: {overlap}\n"
-                    overlap_found = True
-                    break
-
-            if not overlap_found:
-                fonts_section_index = -1
-                for i, line in enumerate(lines):
-                    if "[Fonts]" in line:
-                        fonts_section_index = i
-                        break
-
-                if fonts_section_index == -1:
-                    lines.append("\n[Fonts]\n")
-                    lines.append(f"HitCircleOverlap: {overlap}\n")
-                else:
-                    lines.insert(
-                        fonts_section_index + 1, f"HitCircleOverlap: {overlap}\n"
-                    )
-
-            with open(skin_ini_path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to set hitcircle overlap: {e}")
+        self.start_task(
+            worker.Task(
+                pipeline.instafade_skin,
+                self.skin_folder,
+                self.selected_color,
+                self.hitcircle_prefix,
+                render_cache=self.render_cache,
+            ),
+            self.on_instafade_done,
+        )
 
-    def update_color_options(self, colors: list[tuple[int, int, int]]) -> None:
-        """Update color options in the combo
+    def on_instafade_done(self, kind: str, value: object) -> None:
+        """Handle the end of an instafade task.
 
         Args:
-            colors: List of RGB color tuples
+            kind: "done", "cancelled" or "error"
+            value: Task result or exception
         """
-        self.color_combobox.configure(
-            values=[f"{r}, {g}, {b}" for r, g, b in colors] + ["Custom Color"]
-        )
+        if kind == "done":
+            self.progress_bar.set(1.0)
+            self.after(500, self.progress_bar.grid_remove)
+            return
 
-    def create_backup_folder(self) -> None:
-        """Create backup directory and return its path"""
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        self.backup_dir = os.path.join(
-            self.skin_folder, f"{"instafader-backup"}-{timestamp}"
-        )
-        os.makedirs(self.backup_dir, exist_ok=True)
+        self.progress_bar.grid_remove()
+        if kind == "cancelled":
+            messagebox.showinfo(
+                "Cancelled",
+                "Instafade cancelled. The skin was left unchanged.",
+            )
+        else:
+            messagebox.showerror("Error", f"Failed to instafade skin: {value}")
 
-    def backup_file(self, file_name: str) -> None:
-        """Backup file to backup directory.
+    def on_variants_done(self, kind: str, value: object) -> None:
+        """Handle the end of a task rendering every combo color.
 
         Args:
-            file_name: Name of file to backup
+            kind: "done", "cancelled" or "error"
+            value: Task result or exception
         """
-        try:
-            source_path = os.path.join(self.skin_folder, file_name)
-            dest_path = os.path.join(self.backup_dir, file_name)
-            shutil.copy2(source_path, dest_path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to backup file: {e}")
-
-    def load_skin_element(
-        self, basename: str, backup_folder: str
-    ) -> tuple[Image.Image, bool]:
-        """Load a skin element and backup the original file.
-
-        Args:
-            basename: Base name of the file without HD suffix (e.g. "hitcircle" or "skin/numbers/default-1")
-            backup_folder: Path to backup folder
+        self.progress_bar.grid_remove()
 
-        Returns:
-            tuple: (PIL Image object, bool indicating if HD version)
+        if kind == "done":
+            messagebox.showinfo(
+                "Success",
+                f"Rendered {len(value)} color variants into {pipeline.VARIANTS_FOLDER}",
+            )
+        elif kind == "error":
+            messagebox.showerror("Error", f"Failed to render color variants: {value}")
 
-        Raises:
-            FileNotFoundError: If neither HD nor SD version exists
-        """
-        # Extract directory path and filename
-        dirname = os.path.dirname(basename)
-        filename = os.path.basename(basename)
-
-        hd_name = f"{filename}@2x.png"
-        sd_name = f"{filename}.png"
-
-        # Create full paths including subdirectories
-        hd_path = (
-            os.path.join(self.skin_folder, dirname, hd_name)
-            if dirname
-            else os.path.join(self.skin_folder, hd_name)
-        )
-        sd_path = (
-            os.path.join(self.skin_folder, dirname, sd_name)
-            if dirname
-            else os.path.join(self.skin_folder, sd_name)
-        )
+    def revert_to_backup(self) -> None:
+        """Restore skin files from the most recent backup folder on a background worker"""
+        if not self.skin_folder:
+            messagebox.showerror("Error", "No skin folder selected")
+            return
 
-        # Create backup subdirectories if needed
-        backup_subdir = (
-            os.path.join(backup_folder, dirname) if dirname else backup_folder
+        self.start_task(
+            worker.Task(backup.revert_to_backup, self.skin_folder),
+            self.on_revert_done,
         )
-        os.makedirs(backup_subdir, exist_ok=True)
 
-        try:
-            image = Image.open(hd_path).convert("RGBA")
-            shutil.copy2(hd_path, os.path.join(backup_subdir, hd_name))
-            return image, True
-        except FileNotFoundError:
-            try:
-                image = Image.open(sd_path).convert("RGBA")
-                shutil.copy2(sd_path, os.path.join(backup_subdir, sd_name))
-                return image, False
-            except FileNotFoundError:
-                raise FileNotFoundError(
-                    f"Could not find {basename} in HD or SD version"
-                )
-
-    def calculate_resize_factor(self, element_is_hd: bool, other_is_hd: bool) -> float:
-        """Calculate the resize factor based on HD status of both elements.
+    def on_revert_done(self, kind: str, value: object) -> None:
+        """Handle the end of a revert task.
 
         Args:
-            element_is_hd: Whether the current element is HD
-            other_is_hd: Whether the other element is HD
-
-        Returns:
-            float: Resize factor (2.5 if SD->HD conversion needed, 1.25 for normal scaling)
+            kind: "done", "cancelled" or "error"
+            value: Task result or exception
         """
-        return 2.5 if not element_is_hd and other_is_hd else 1.25
-
-    def resize_element(self, image: Image.Image, scale: float) -> Image.Image:
-        """Resize an image by a given scale factor.
+        self.progress_bar.grid_remove()
 
-        Args:
-            image: PIL Image to resize
-            scale: Scale factor to apply
+        if kind == "done":
+            messagebox.showinfo("Success", "Successfully reverted to backup")
 
-        Returns:
-            Image.Image: Resized image
-        """
-        new_size = (int(image.width * scale), int(image.height * scale))
-        return image.resize(new_size, resample=Image.Resampling.LANCZOS)
+            self.load_skin_ini()
+            if self.colors:
+                self.generate_preview(self.colors[0])
+        elif kind == "cancelled":
+            messagebox.showinfo(
+                "Cancelled",
+                "Revert cancelled. The skin was left unchanged.",
+            )
+        else:
+            messagebox.showerror("Error", f"Failed to revert to backup: {value}")
 
-    def create_composite_image(
-        self, base: Image.Image, overlay: Image.Image
-    ) -> Image.Image:
-        """Create a composite image by combining two images, centering the smaller one.
+    def start_task(
+        self, task: worker.Task, on_done: Callable[[str, object], None]
+    ) -> None:
+        """Run a task on a background thread and follow its progress.
 
         Args:
-            base: Base image (hitcircle)
-            overlay: Overlay image (hitcircleoverlay)
-
-        Returns:
-            Image.Image: Combined image
+            task: Task to start
+            on_done: Called on the Tk thread with the task's final event
         """
-        base = base.convert("RGBA")
-        overlay = overlay.convert("RGBA")
+        self.task = task.start()
+        self.on_task_done = on_done
 
-        if base.size == overlay.size:
-            return Image.alpha_composite(base, overlay)
-
-        result = Image.new("RGBA", overlay.size, (0, 0, 0, 0))
-        paste_position = (
-            (overlay.width - base.width) // 2,
-            (overlay.height - base.height) // 2,
-        )
-        temp = Image.new("RGBA", overlay.size, (0, 0, 0, 0))
-        temp.paste(base, paste_position)
-        result = Image.alpha_composite(temp, result)
-        result.paste(overlay, (0, 0), overlay)
-
-        return result
-
-    def instafade(self) -> None:
-        """Instafade the skin"""
-        self.progress_bar.grid()
         self.progress_bar.set(0)
-        self.update()
-
-        self.create_backup_folder()
-        self.progress_bar.set(0.1)
-        self.update()
-
-        self.backup_file("skin.ini")
-        self.progress_bar.set(0.2)
-        self.update()
-
-        hitcircle, hitcircle_hd = self.load_skin_element("hitcircle", self.backup_dir)
-        hitcircleoverlay, hitcircleoverlay_hd = self.load_skin_element(
-            "hitcircleoverlay", self.backup_dir
-        )
-        self.progress_bar.set(0.3)
-        self.update()
-
-        solid_color = Image.new(
-            mode="RGBA",
-            size=(hitcircle.width, hitcircle.height),
-            color=self.selected_color,
-        )
-
-        hitcircle = ImageChops.multiply(
-            hitcircle.convert("RGBA"), solid_color.convert("RGBA")
-        )
-        self.progress_bar.set(0.4)
-        self.update()
-
-        hitcircle = self.resize_element(
-            hitcircle, self.calculate_resize_factor(hitcircle_hd, hitcircleoverlay_hd)
-        )
-
-        hitcircleoverlay = self.resize_element(
-            hitcircleoverlay,
-            self.calculate_resize_factor(hitcircleoverlay_hd, hitcircle_hd),
-        )
-        self.progress_bar.set(0.5)
-        self.update()
-
-        circle_hd = hitcircle_hd or hitcircleoverlay_hd
-
-        circle = self.create_composite_image(hitcircle, hitcircleoverlay)
-        circle.save(os.path.join(self.skin_folder, "circle.png"))
-        self.progress_bar.set(0.6)
-        self.update()
-
-        for i in range(1, 10):
-            # Extract directory path and filename base from hitcircle_prefix
-            prefix_dir = os.path.dirname(self.hitcircle_prefix)
-            prefix_base = os.path.basename(self.hitcircle_prefix)
-
-            number, number_hd = self.load_skin_element(
-                f"{self.hitcircle_prefix}-{i}", self.backup_dir
-            )
-
-            circle = Image.open(os.path.join(self.skin_folder, "circle.png"))
-
-            if number.size > circle.size:
-                no_number = Image.new("RGBA", number.size, (255, 255, 255, 0))
-                paste_position = (
-                    (number.width - circle.width) // 2,
-                    (number.height - circle.height) // 2,
-                )
-                no_number.paste(circle, paste_position, circle)
-                no_number.paste(number, (0, 0))
-            else:
-                no_number = circle
-
-            w, h = number.size
-            if not number_hd and circle_hd:
-                number = number.resize(
-                    (w * 2, h * 2), resample=Image.Resampling.LANCZOS
-                )
-
-            x, y = no_number.size
-            no_number.paste(number, ((x - w) // 2, (y - h) // 2), number)
-
-            # Create output directory if it doesn't exist
-            output_dir = os.path.join(self.skin_folder, prefix_dir)
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Save with correct path
-            output_path = os.path.join(
-                output_dir,
-                f"{prefix_base}-{i}{'@2x' if number_hd else ''}.png",
-            )
-            no_number.save(output_path)
-
-            self.progress_bar.set(0.6 + (i * 0.02))
-            self.update()
-
-        default_0, default_0_hd = self.load_skin_element(
-            f"{self.hitcircle_prefix}-0", self.backup_dir
-        )
-        self.progress_bar.set(0.85)
-        self.update()
-
-        default_0 = Image.new("RGBA", (no_number.size), (255, 255, 255, 0))
-        default_0.save(
-            os.path.join(
-                self.skin_folder,
-                f"{self.hitcircle_prefix}-0{'@2x' if default_0_hd else ''}.png",
-            )
-        )
-        self.progress_bar.set(0.9)
-        self.update()
-
-        blank_image = Image.new("RGBA", (1, 1), (255, 255, 255, 0))
-        blank_image.save(
-            os.path.join(
-                self.skin_folder,
-                f"hitcircle{'@2x' if hitcircle_hd else ''}.png",
-            )
-        )
-        blank_image.save(
-            os.path.join(
-                self.skin_folder,
-                f"hitcircleoverlay{'@2x' if hitcircleoverlay_hd else ''}.png",
-            )
-        )
-        self.progress_bar.set(0.95)
-        self.update()
-
-        try:
-            os.remove(os.path.join(self.skin_folder, "circle.png"))
-            os.remove(os.path.join(self.skin_folder, "sliderstartcircle.png"))
-            os.remove(os.path.join(self.skin_folder, "sliderstartcircle@2x.png"))
-            os.remove(os.path.join(self.skin_folder, "sliderstartcircleoverlay.png"))
-            os.remove(os.path.join(self.skin_folder, "sliderstartcircleoverlay@2x.png"))
-        except FileNotFoundError:
-            pass
-
-        self.set_overlap(str(x // 2 if number_hd else x))
-        self.set_color(self.selected_color)
-        self.add_header()
-
-        self.progress_bar.set(1.0)
-        self.update()
-        self.after(500, self.progress_bar.grid_remove)
+        self.progress_bar.grid()
+        self.instafade_button.configure(text="Cancel", command=self.cancel_task)
+        self.revert_button.configure(state="disabled")
 
-    def get_latest_backup(self) -> str | None:
-        """Find the most recent backup folder in the skin directory.
+        self.after(PROGRESS_INTERVAL_MS, self.poll_task)
 
-        Returns:
-            str | None: Path to most recent backup folder, or None if no backups found
-        """
-        if not self.skin_folder:
-            return None
-
-        backup_folders = [
-            d
-            for d in os.listdir(self.skin_folder)
-            if os.path.isdir(os.path.join(self.skin_folder, d))
-            and d.startswith("instafader-backup")
-        ]
-
-        if not backup_folders:
-            return None
-
-        # Sort by creation time, newest first
-        backup_folders.sort(
-            key=lambda x: os.path.getctime(os.path.join(self.skin_folder, x)),
-            reverse=True,
-        )
-        return os.path.join(self.skin_folder, backup_folders[0])
+    def poll_task(self) -> None:
+        """Drain the running task's progress queue, once per frame"""
+        progress, final = self.task.poll()
+        if progress is not None:
+            self.progress_bar.set(progress)
 
-    def revert_to_backup(self) -> None:
-        """Restore skin files from the most recent backup folder"""
-        if not self.skin_folder:
-            messagebox.showerror("Error", "No skin folder selected")
+        if final is None:
+            self.after(PROGRESS_INTERVAL_MS, self.poll_task)
             return
 
-        backup_dir = self.get_latest_backup()
-        if not backup_dir:
-            messagebox.showerror("Error", "No backup found to revert to")
-            return
-
-        try:
-            self.progress_bar.grid()
-            self.progress_bar.set(0)
-            self.update()
-
-            backup_files = os.listdir(backup_dir)
-            for i, filename in enumerate(backup_files):
-                src = os.path.join(backup_dir, filename)
-                dst = os.path.join(self.skin_folder, filename)
-                shutil.copy2(src, dst)
+        self.task = None
+        self.instafade_button.configure(text="Instafade!", command=self.instafade)
+        self.revert_button.configure(state="normal")
+        self.on_task_done(*final)
 
-                progress = (i + 1) / len(backup_files)
-                self.progress_bar.set(progress)
-                self.update()
+    def cancel_task(self) -> None:
+        """Cancel the running task at its next progress report"""
+        if self.task:
+            self.task.cancel()
 
-            messagebox.showinfo("Success", "Successfully reverted to backup")
 
-            self.load_skin_ini()
-            if self.colors:
-                self.generate_preview(self.colors[0])
+def main() -> None:
+    """Configure the theme and run the window.
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to revert to backup: {e}")
-        finally:
-            self.progress_bar.grid_remove()
+    Importing this module still imports customtkinter and tkinter, only the
+    theme setup waits until here. Headless use goes through the Tk-free
+    instafader package.
+    """
+    customtkinter.set_appearance_mode("system")
+    customtkinter.set_default_color_theme("blue")
 
-    def add_header(self):
-        """Add header to skin.ini file."""
-        try:
-            skin_ini_path = os.path.join(self.skin_folder, "skin.ini")
-            with open(skin_ini_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            header = (
-                "// instafade skin generated by https://github.com/SnowzNZ/instafader\n"
-            )
-            if not any(header.strip() in line for line in lines):
-                lines.insert(0, header)  # Add header at the top
-                with open(skin_ini_path, "w", encoding="utf-8") as f:
-                    f.writelines(lines)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add header: {e}")
+    instafader = Instafader()
+    instafader.mainloop()
 
 
 if __name__ == "__main__":
-    instafader = Instafader()
-    instafader.mainloop()
+    main()
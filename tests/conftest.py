@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The package lives in src/ and isn't installed
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from instafader import backup, bench, pipeline, transaction
+from test_transaction import Crash, read_skin
+
+
+def test_revert_restores_original(tmp_path):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    files = read_skin(skin_folder)
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+
+    backup.revert_to_backup(skin_folder)
+
+    assert read_skin(skin_folder) == files
+
+
+def test_cancelled_revert_leaves_skin(tmp_path):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+    files = read_skin(skin_folder)
+
+    def progress(value: float) -> None:
+        if value >= 0.5:
+            raise Crash
+
+    with pytest.raises(Crash):
+        backup.revert_to_backup(skin_folder, progress)
+
+    assert read_skin(skin_folder) == files
+    assert not os.listdir(backup.store_path(skin_folder, transaction.STAGING_FOLDER))
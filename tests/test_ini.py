@@ -0,0 +1,128 @@
+import os
+import stat
+
+import pytest
+
+from instafader import ini
+
+HEADER = ini.HEADER.encode()
+
+ROUND_TRIPS = [
+    b"[General]\nName: plain\n",
+    b"\xef\xbb\xbf[General]\r\nName: bom\r\n",
+    b"[General]\r\nName: crlf\r\n\r\n[Colours]\r\nCombo1: 1,2,3\r\n",
+    b"[General]\nName: caf\xe9 latin-1\n",
+    b"[General]\nName: no final newline",
+    b"[General]\r\nName: mixed\n// comment\r\n",
+    b"",
+]
+
+
+@pytest.mark.parametrize("data", ROUND_TRIPS)
+def test_round_trip(data):
+    assert ini.SkinIni.parse(data).to_bytes() == data
+
+
+def test_encodings():
+    assert ini.SkinIni.parse(b"\xef\xbb\xbfName: a\n").encoding == "utf-8-sig"
+    assert ini.SkinIni.parse("Name: é\n".encode()).encoding == "utf-8"
+    assert ini.SkinIni.parse(b"Name: \xe9\n").encoding == "latin-1"
+
+
+def edit(data: bytes, overlap: str, color: tuple[int, int, int]) -> bytes:
+    skin_ini = ini.SkinIni.parse(data)
+    skin_ini.set_overlap(overlap)
+    skin_ini.set_color(color)
+    skin_ini.add_header()
+    return skin_ini.to_bytes()
+
+
+def test_edit_existing_sections():
+    data = (
+        b"[General]\r\nName: a\r\n\r\n[Colours]\r\nCombo1: 1,2,3\r\n"
+        b"// Combo3: 7,8,9\r\nCombo2: 4,5,6\r\n\r\n"
+        b"[Fonts]\r\nHitCirclePrefix: default\r\nHitCircleOverlap: 3\r\n"
+    )
+
+    assert edit(data, "160", (255, 0, 0)) == (
+        HEADER + b"\r\n[General]\r\nName: a\r\n\r\n[Colours]\r\n"
+        b"Combo1: 255, 0, 0\r\n// Combo3: 7,8,9\r\n\r\n"
+        b"[Fonts]\r\nHitCirclePrefix: default\r\nHitCircleOverlap: 160\r\n"
+    )
+
+
+def test_edit_adds_overlap_to_fonts():
+    data = b"[Fonts]\nHitCirclePrefix: default\n\n[Colours]\nCombo1: 1,2,3\n"
+
+    assert edit(data, "160", (255, 0, 0)) == (
+        HEADER + b"\n[Fonts]\nHitCircleOverlap: 160\nHitCirclePrefix: default\n"
+        b"\n[Colours]\nCombo1: 255, 0, 0\n"
+    )
+
+
+def test_edit_adds_missing_sections():
+    data = b"\xef\xbb\xbf[General]\r\nName: a"
+
+    assert edit(data, "160", (255, 0, 0)) == (
+        b"\xef\xbb\xbf" + HEADER + b"\r\n[General]\r\nName: a\r\n"
+        b"[Fonts]\r\nHitCircleOverlap: 160\r\n"
+        b"[Colours]\r\nCombo1: 255, 0, 0\r\n"
+    )
+
+
+def test_edit_adds_missing_sections_after_final_newline():
+    data = b"[General]\nName: a\n"
+
+    assert edit(data, "160", (255, 0, 0)) == (
+        HEADER + b"\n[General]\nName: a\n\n[Fonts]\nHitCircleOverlap: 160\n"
+        b"[Colours]\nCombo1: 255, 0, 0\n"
+    )
+
+
+def test_edit_keeps_latin_1():
+    data = b"[General]\nName: caf\xe9\n"
+
+    assert edit(data, "160", (255, 0, 0)).startswith(
+        HEADER + b"\n[General]\nName: caf\xe9\n"
+    )
+
+
+def test_add_header_once():
+    skin_ini = ini.SkinIni.parse(b"[General]\n")
+    skin_ini.add_header()
+    skin_ini.add_header()
+
+    assert skin_ini.to_bytes() == HEADER + b"\n[General]\n"
+
+
+def test_get_colors():
+    skin_ini = ini.SkinIni.parse(
+        b"[Colours]\nCombo1: 1, 2, 3\n//Combo2: 4,5,6\nCombo3 : 7,8,9,255\n"
+    )
+
+    assert skin_ini.get_colors() == [(1, 2, 3), (7, 8, 9, 255)]
+    assert ini.SkinIni.parse(b"[General]\n").get_colors() == ini.DEFAULT_COLORS
+
+
+@pytest.mark.parametrize("value", ["1,2", "1,2,3,4", "256,0,0", "-1,0,0", "a,b,c"])
+def test_parse_color_rejects(value):
+    with pytest.raises(ValueError):
+        ini.parse_color(value)
+
+
+def test_parse_color():
+    assert ini.parse_color("255, 0,128") == (255, 0, 128)
+
+
+def test_save_keeps_mode(tmp_path):
+    path = str(tmp_path / "skin.ini")
+    with open(path, "wb") as f:
+        f.write(b"[General]\n")
+    os.chmod(path, 0o640)
+
+    ini.SkinIni.parse(b"[General]\nName: a\n").save(path)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    with open(path, "rb") as f:
+        assert f.read() == b"[General]\nName: a\n"
+    assert os.listdir(tmp_path) == ["skin.ini"]
@@ -0,0 +1,105 @@
+import io
+import os
+import random
+import struct
+import zipfile
+
+import pytest
+
+from instafader import bench, osk
+
+ROOT = "My Skin/"
+# Members an instafade doesn't touch, copied over without recompressing
+EXTRA_MEMBERS = {
+    "Sounds/Normal-HitClap.wav": random.Random(0).randbytes(4096),
+    "Cursor.PNG": random.Random(1).randbytes(512),
+    "readme.txt": b"made for testing\n" * 20,
+}
+
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream, which makes ZipFile follow members with data descriptors."""
+
+    def __init__(self, target: io.BytesIO):
+        self.target = target
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.target.write(data)
+
+
+def make_osk(tmp_path, data_descriptors: bool) -> str:
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+
+    buffer = io.BytesIO()
+    stream = Unseekable(buffer) if data_descriptors else buffer
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(zipfile.ZipInfo(ROOT), b"")
+        for file_name in sorted(os.listdir(skin_folder)):
+            # osu! matches names case-insensitively
+            name = file_name.replace("hitcircle", "HitCircle")
+            with open(os.path.join(skin_folder, file_name), "rb") as f:
+                archive.writestr(ROOT + name, f.read())
+        for name, data in EXTRA_MEMBERS.items():
+            archive.writestr(ROOT + name, data)
+
+    osk_path = str(tmp_path / "My Skin.osk")
+    with open(osk_path, "wb") as f:
+        f.write(buffer.getvalue())
+
+    return osk_path
+
+
+def raw_member(osk_path: str, info: zipfile.ZipInfo) -> bytes:
+    """Compressed bytes of an archive member, as stored."""
+    with open(osk_path, "rb") as f:
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", f.read(4))
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        return f.read(info.compress_size)
+
+
+@pytest.mark.parametrize("data_descriptors", [False, True])
+def test_instafade_osk_round_trip(tmp_path, data_descriptors):
+    osk_path = make_osk(tmp_path, data_descriptors)
+    with zipfile.ZipFile(osk_path) as source:
+        if data_descriptors:
+            assert all(info.flag_bits & 0x08 for info in source.infolist())
+        raw = {
+            name: raw_member(osk_path, source.getinfo(ROOT + name))
+            for name in EXTRA_MEMBERS
+        }
+
+    output_path = osk.instafade_osk(osk_path, (255, 0, 0))
+
+    assert output_path == str(tmp_path / "My Skin (instafade).osk")
+    with zipfile.ZipFile(output_path) as output:
+        assert output.testzip() is None
+        names = output.namelist()
+        assert len(names) == len(set(name.lower() for name in names))
+
+        for name, data in EXTRA_MEMBERS.items():
+            info = output.getinfo(ROOT + name)
+            assert output.read(info) == data
+            assert raw_member(output_path, info) == raw[name]
+
+        # Generated files replace the members under their original names
+        assert ROOT + "HitCircle@2x.png" in names
+        assert ROOT + "hitcircle@2x.png" not in names
+        assert ROOT + "sliderstartcircle.png" not in names
+        assert b"instafade" in output.read(ROOT + "skin.ini")
+
+
+def test_find_root_prefers_shallowest_skin_ini():
+    members = {
+        name: zipfile.ZipInfo(name)
+        for name in ["my skin/skin.ini", "my skin/old/skin.ini", "my skin/a.png"]
+    }
+
+    assert osk.find_root(members) == "my skin/"
+    assert osk.find_root({"skin.ini": zipfile.ZipInfo("skin.ini")}) == ""
+    with pytest.raises(FileNotFoundError):
+        osk.find_root({"a.png": zipfile.ZipInfo("a.png")})
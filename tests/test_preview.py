@@ -0,0 +1,17 @@
+import pytest
+
+from instafader import bench, preview
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 6, 10])
+def test_preview_grid_is_square(tmp_path, count):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    colors = [(255, 0, 0)] * count
+
+    grid = preview.render_preview_grid(
+        skin_folder, "default", colors, preview.PREVIEW_SIZE
+    )
+
+    assert grid.width == grid.height
+    assert grid.width <= preview.PREVIEW_SIZE
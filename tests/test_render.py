@@ -0,0 +1,103 @@
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from instafader import render
+
+SIZES = [
+    # Same size, smaller base, larger base
+    ((128, 128), (128, 128)),
+    ((100, 100), (160, 160)),
+    ((101, 77), (160, 150)),
+    ((200, 200), (128, 128)),
+    ((1, 1), (7, 9)),
+]
+
+
+def random_image(rng: random.Random, size: tuple[int, int]) -> Image.Image:
+    return Image.frombytes(
+        "RGBA", size, bytes(rng.randrange(256) for _ in range(size[0] * size[1] * 4))
+    )
+
+
+def circle_image(size: int, fill: tuple[int, int, int, int]) -> Image.Image:
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse(
+        (2, 2, size - 3, size - 3),
+        fill=fill,
+        outline=(255, 255, 255, 255),
+        width=max(1, size // 20),
+    )
+    return image
+
+
+def run_engine(monkeypatch, engine: str, func, *args) -> bytes:
+    monkeypatch.setattr(render, "ENGINE", engine)
+    return func(*args).tobytes()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_tint_matches_reference(monkeypatch, seed):
+    rng = random.Random(seed)
+    image = random_image(rng, (rng.randint(1, 64), rng.randint(1, 64)))
+    color = tuple(rng.randrange(256) for _ in range(3))
+
+    assert run_engine(monkeypatch, "fast", render.tint, image, color) == run_engine(
+        monkeypatch, "reference", render.tint, image, color
+    )
+
+
+def test_tint_converts_other_modes(monkeypatch):
+    image = random_image(random.Random(0), (32, 32)).convert("LA")
+
+    assert run_engine(
+        monkeypatch, "fast", render.tint, image, (255, 0, 128)
+    ) == run_engine(monkeypatch, "reference", render.tint, image, (255, 0, 128))
+
+
+@pytest.mark.parametrize("color", [(255, 192, 0, 255), (18, 124, 255, 128)])
+def test_tint_with_alpha_component(monkeypatch, color):
+    # skin.ini combo colors may be written as "r,g,b,a"
+    image = random_image(random.Random(1), (32, 32))
+
+    assert run_engine(monkeypatch, "fast", render.tint, image, color) == run_engine(
+        monkeypatch, "reference", render.tint, image, color
+    )
+
+
+@pytest.mark.parametrize("base_size, overlay_size", SIZES)
+@pytest.mark.parametrize("seed", range(4))
+def test_composite_matches_reference(monkeypatch, base_size, overlay_size, seed):
+    rng = random.Random(seed)
+    base = random_image(rng, base_size)
+    overlay = random_image(rng, overlay_size)
+
+    assert run_engine(
+        monkeypatch, "fast", render.create_composite_image, base, overlay
+    ) == run_engine(
+        monkeypatch, "reference", render.create_composite_image, base, overlay
+    )
+
+
+@pytest.mark.parametrize("hitcircle_hd", [False, True])
+@pytest.mark.parametrize("hitcircleoverlay_hd", [False, True])
+def test_render_circle_matches_reference(
+    monkeypatch, hitcircle_hd, hitcircleoverlay_hd
+):
+    hitcircle = circle_image(256 if hitcircle_hd else 128, (200, 200, 200, 180))
+    hitcircleoverlay = circle_image(
+        256 if hitcircleoverlay_hd else 128, (255, 255, 255, 60)
+    )
+    args = (
+        hitcircle,
+        hitcircle_hd,
+        hitcircleoverlay,
+        hitcircleoverlay_hd,
+        (0, 128, 255),
+    )
+
+    assert run_engine(monkeypatch, "fast", render.render_circle, *args) == run_engine(
+        monkeypatch, "reference", render.render_circle, *args
+    )
@@ -0,0 +1,43 @@
+import os
+
+from PIL import Image
+
+from instafader import backup, bench, pipeline, scan
+
+
+def test_scan_reads_originals_of_instafaded_skin(tmp_path):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    before = scan.scan_skin(skin_folder)
+
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+    after = scan.scan_skin(skin_folder)
+
+    assert after.instafaded
+    assert after.elements == before.elements
+    assert after.overlap == before.overlap
+
+
+def test_scan_reads_art_saved_after_instafade(tmp_path):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+
+    Image.new("RGBA", (600, 600), (255, 255, 255, 200)).save(
+        os.path.join(skin_folder, "hitcircleoverlay@2x.png")
+    )
+    info = scan.scan_skin(skin_folder)
+    assert info.elements["hitcircleoverlay"].width == 600
+
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+    with open(os.path.join(skin_folder, "skin.ini"), encoding="utf-8") as f:
+        assert f"HitCircleOverlap: {info.overlap}" in f.read()
+
+
+def test_scan_reverted_skin_is_not_instafaded(tmp_path):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+    backup.revert_to_backup(skin_folder)
+
+    assert not scan.scan_skin(skin_folder).instafaded
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+from PIL import Image
+
+from instafader import backup, bench, pipeline, transaction
+
+
+class Crash(Exception):
+    """Stands in for the process dying."""
+
+
+def read_skin(skin_folder: str) -> dict[str, bytes]:
+    """Contents of every skin file, leaving out the backup store."""
+    files = {}
+    for root, folders, file_names in os.walk(skin_folder):
+        folders[:] = [name for name in folders if name != backup.STORE_FOLDER]
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, skin_folder)] = f.read()
+
+    return files
+
+
+def test_recover_finishes_interrupted_apply(tmp_path, monkeypatch):
+    expected_folder = str(tmp_path / "expected")
+    bench.make_skin(expected_folder)
+    pipeline.instafade_skin(expected_folder, (255, 0, 0))
+
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    apply = transaction.apply
+    replace = os.replace
+
+    def crashing_apply(skin_folder: str, journal_path: str) -> None:
+        moved = 0
+
+        def crashing_replace(src, dst):
+            nonlocal moved
+            if moved == 3:
+                raise Crash
+            moved += 1
+            replace(src, dst)
+
+        with monkeypatch.context() as m:
+            m.setattr(os, "replace", crashing_replace)
+            apply(skin_folder, journal_path)
+
+    with monkeypatch.context() as m:
+        m.setattr(transaction, "apply", crashing_apply)
+        with pytest.raises(Crash):
+            pipeline.instafade_skin(skin_folder, (255, 0, 0))
+
+    assert read_skin(skin_folder) != read_skin(expected_folder)
+
+    with transaction.SkinLock(skin_folder):
+        assert transaction.recover(skin_folder) == 1
+
+    assert read_skin(skin_folder) == read_skin(expected_folder)
+    assert len(backup.read_index(skin_folder)["snapshots"]) == 1
+    assert not os.listdir(backup.store_path(skin_folder, transaction.JOURNAL_FOLDER))
+
+
+def test_error_before_commit_leaves_skin_and_index(tmp_path, monkeypatch):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    pipeline.instafade_skin(skin_folder, (255, 0, 0))
+    files = read_skin(skin_folder)
+    index = backup.read_index(skin_folder)
+
+    def failing_write_outputs(*args, **kwargs):
+        raise Crash
+
+    monkeypatch.setattr(pipeline, "write_outputs", failing_write_outputs)
+    with pytest.raises(Crash):
+        pipeline.instafade_skin(skin_folder, (0, 0, 255))
+
+    assert read_skin(skin_folder) == files
+    assert backup.read_index(skin_folder) == index
+    assert not os.listdir(backup.store_path(skin_folder, transaction.STAGING_FOLDER))
+
+
+def test_file_changed_before_commit_is_kept(tmp_path, monkeypatch):
+    skin_folder = str(tmp_path / "skin")
+    bench.make_skin(skin_folder)
+    files = read_skin(skin_folder)
+    number_path = os.path.join(skin_folder, "default-5@2x.png")
+    write_outputs = pipeline.write_outputs
+
+    def saving_write_outputs(*args, **kwargs):
+        overlap = write_outputs(*args, **kwargs)
+        # Saved in an editor while the outputs were rendered
+        Image.new("RGBA", (90, 117), (255, 255, 255, 255)).save(number_path)
+        return overlap
+
+    monkeypatch.setattr(pipeline, "write_outputs", saving_write_outputs)
+    with pytest.raises(transaction.SkinChanged):
+        pipeline.instafade_skin(skin_folder, (255, 0, 0))
+
+    with open(number_path, "rb") as f:
+        files["default-5@2x.png"] = f.read()
+    assert read_skin(skin_folder) == files
+    assert backup.read_index(skin_folder)["snapshots"] == []